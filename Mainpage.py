@@ -1,12 +1,14 @@
 from PyQt6.QtWidgets import (
     QWidget, QPushButton, QTextEdit, QVBoxLayout, QGridLayout, QGraphicsDropShadowEffect, QDateEdit, QDateEdit, QTimeEdit,
     QLabel, QSpacerItem, QSizePolicy, QMenu, QLineEdit, QDialog, QHBoxLayout, QFrame, 
-    QGraphicsOpacityEffect, QApplication, QFileDialog, QScrollArea, QWidgetAction
+    QApplication, QFileDialog, QScrollArea, QWidgetAction
 )
 from PyQt6.QtCore import Qt, QSize, QPropertyAnimation, QPoint, QRect, QMimeData, QAbstractItemModel, QItemSelectionModel, QSortFilterProxyModel, QDate, QTime, QDateTime, pyqtSignal, QTimer
 from PyQt6.QtGui import QDrag, QMouseEvent, QIcon, QColor, QAction
 from back import NotesBackend, ReminderManager
 from styles import Styles
+from notes_view import NotesGridView, CardPixmapCache, preview_text, snippet_html
+from search_worker import AsyncSearcher
 import sys
 import os
 
@@ -15,18 +17,42 @@ def resource_path(relative_path):
         return os.path.join(sys._MEIPASS, relative_path)
     return os.path.join(os.path.abspath("."), relative_path)
 
+CARD_CHUNK_SIZE = 200
+
 class MainPage(QWidget):
-    def __init__(self, backend):
+    cards_built = pyqtSignal()
+
+    def __init__(self, backend, virtual_grid=False):
         super().__init__()
         self.backend = backend
         self.is_dark_mode = False 
+        self.notes_view = None
+
+        self.card_cache = CardPixmapCache(backend)
+        self.searcher = AsyncSearcher(backend, self)
+        self.searcher.order_ready.connect(self.apply_ranking)
+        self.searcher.results_ready.connect(self.update_notes_opacity)
 
+        # нагадування завантажує NotesApp уже після першого показу вікна
         self.reminder_manager = ReminderManager(self)
-        self.reminder_manager.load_saved_reminders()
 
         self.setAcceptDrops(True)
 
         self.note_buttons = []
+        self.note_cards = {}
+        self.card_signatures = {}
+        self.card_cells = {}
+        self.dimmed_ids = set()
+        self.ranked_ids = []
+        # запит, збіги якого показуються на картках, і що саме зараз показує кожна картка
+        self.snippet_query = ""
+        self.card_snippets = {}
+        self.pending_note_ids = []
+        self.pending_position = 0
+        # затемнення для ще не збудованих карток застосовується, коли їх збудує черговий порціон
+        self.pending_dimmed = set()
+        self.card_build_scheduled = False
+        self.grid_columns = 1
         self.expanded_notes = {}
         self.highlighted_index = None
         self.ignore_resize = False
@@ -36,6 +62,10 @@ class MainPage(QWidget):
         self.resize_timer.setSingleShot(True)
         self.resize_timer.timeout.connect(self.handle_resize_timeout)
         self.resize_delay = 150
+
+        self.snippet_timer = QTimer()
+        self.snippet_timer.setSingleShot(True)
+        self.snippet_timer.timeout.connect(self.update_card_snippets)
         
         self.button_position_timer = QTimer()
         self.button_position_timer.setSingleShot(True)
@@ -45,28 +75,28 @@ class MainPage(QWidget):
         self.pending_size = None
         self.last_window_size = None
 
-        self.setStyleSheet(Styles.get_main_style(self.is_dark_mode))
+        self.size_class = 'large'
+        self.current_style = Styles.SCREEN_STYLES[self.size_class]
 
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setContentsMargins(0, 0, 0, 0)
         self.main_layout.setSpacing(0)
 
-        self.scroll_area = QScrollArea(self)
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        self.scroll_area.setStyleSheet(Styles.get_scroll_area_style(self.is_dark_mode))
-        self.scroll_area.viewport().setStyleSheet(Styles.get_scroll_area_viewport_style(self.is_dark_mode))
-        self.scroll_area.verticalScrollBar().setStyleSheet(Styles.get_scrollbar_style(self.is_dark_mode))
-
         self.notes_container = QWidget()
-        self.notes_container.setStyleSheet(Styles.get_notes_container_style(self.is_dark_mode))
+        self.notes_container.setObjectName("notesContainer")
         self.notes_layout = QGridLayout(self.notes_container)
         self.notes_layout.setSpacing(50)
         self.notes_layout.setContentsMargins(20, 20, 20, 20)
         self.notes_layout.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
 
-        self.scroll_area.setWidget(self.notes_container)
+        if virtual_grid:
+            self.setup_virtual_grid()
+        else:
+            self.scroll_area = QScrollArea(self)
+            self.scroll_area.setWidgetResizable(True)
+            self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+            self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+            self.scroll_area.setWidget(self.notes_container)
         self.main_layout.addWidget(self.scroll_area)
 
         self.add_button = QPushButton(self)
@@ -82,40 +112,122 @@ class MainPage(QWidget):
         self.update_screen_style()
         self.load_notes()
 
+    def setup_virtual_grid(self):
+        self.notes_view = NotesGridView(self.backend, self.card_cache, self)
+        self.notes_view.setStyleSheet(Styles.get_scroll_area_style(self.is_dark_mode))
+        self.notes_view.verticalScrollBar().setStyleSheet(Styles.get_scrollbar_style(self.is_dark_mode))
+        self.notes_view.note_clicked.connect(lambda note_id: self.expand_note_view(note_id, editable=False))
+        self.notes_view.note_context_menu_requested.connect(self.show_context_menu)
+        self.notes_view.note_moved.connect(self.move_note)
+        # віртуальна сітка сама є областю прокрутки, тому використовується замість QScrollArea
+        self.scroll_area = self.notes_view
+
     def initial_setup(self):
         self.add_button.show()
         self._update_button_position()
         self.scroll_area.verticalScrollBar().valueChanged.connect(self.update_add_button_position)
+        self.scroll_area.verticalScrollBar().valueChanged.connect(lambda: self.snippet_timer.start(50))
+
+    def apply_page_style(self):
+        # уся сторінка разом із картками стилізується однією таблицею, тож Qt розбирає її один раз
+        self.setStyleSheet(Styles.get_page_style(
+            self.is_dark_mode, self.size_class, self.current_style['note_font']))
 
     def update_screen_style(self):
-        width = self.width()
-        if width < 800:
-            self.current_style = Styles.SCREEN_STYLES['small']
-        elif width < 1200:
-            self.current_style = Styles.SCREEN_STYLES['medium']
-        else:
-            self.current_style = Styles.SCREEN_STYLES['large']
+        self.size_class = Styles.screen_size_class(self.width())
+        self.current_style = Styles.SCREEN_STYLES[self.size_class]
+        self.apply_page_style()
         self.notes_layout.setSpacing(int(self.current_style['spacing'].replace('px', '')))
+        if self.notes_view:
+            self.notes_view.set_screen_style(self.current_style, self.size_class)
         note_width, note_height = self.current_style['note_size']
         self.add_button.setFixedSize(note_width * 2, note_height // 2)
         self.add_button.setStyleSheet(Styles.get_floating_add_button_style(self.is_dark_mode))
 
     def load_notes(self):
-        self.arrange_notes(self.backend.get_notes())
-        self.scroll_area.setStyleSheet(Styles.get_scroll_area_style(self.is_dark_mode))
+        self.arrange_notes(range(self.backend.note_count()))
 
     def arrange_notes(self, notes_or_indices):
         if self.ignore_resize:
             return
-        expanded_indices = list(self.expanded_notes.keys())
+        if self.notes_view:
+            self.notes_view.set_screen_style(self.current_style, self.size_class)
+            self.notes_view.notes_model.refresh()
+            return
         for i in reversed(range(self.notes_layout.count())):
             widget = self.notes_layout.itemAt(i).widget()
-            if widget and not any(widget == note for note in self.expanded_notes.values()):
+            if widget:
                 widget.setParent(None)
         self.note_buttons = []
-        notes = self.backend.get_notes()
+        self.note_cards = {}
+        self.card_signatures = {}
+        self.card_cells = {}
+        self.dimmed_ids = set()
+        self.pending_dimmed = set()
         if not notes_or_indices:
-            notes_or_indices = range(len(notes))
+            notes_or_indices = range(self.backend.note_count())
+        self.update_grid_columns()
+        note_ids = [self.backend.note_id_at(value if isinstance(value, int) else display_idx)
+                    for display_idx, value in enumerate(notes_or_indices)]
+        # одразу будується лише перший екран карток, решта — порціями після показу вікна
+        first_screen = self.first_screen_card_count()
+        self.build_note_cards(note_ids[:first_screen])
+        self.pending_note_ids = note_ids
+        self.pending_position = min(first_screen, len(note_ids))
+        if self.pending_position < len(note_ids):
+            self.schedule_card_build()
+        else:
+            self.cards_built.emit()
+
+    def first_screen_card_count(self):
+        screen = QApplication.primaryScreen().availableGeometry()
+        note_width, note_height = self.current_style['note_size']
+        columns = max(1, screen.width() // (note_width + 20))
+        rows = screen.height() // (note_height + 20) + 1
+        return columns * rows
+
+    def build_note_cards(self, note_ids):
+        start = len(self.note_buttons)
+        for note_id in note_ids:
+            note_btn = self.create_note_card(note_id)
+            if note_id in self.expanded_notes:
+                note_btn.setVisible(False)
+            if note_id in self.pending_dimmed:
+                self.pending_dimmed.discard(note_id)
+                self.dimmed_ids.add(note_id)
+                self.set_card_state(note_btn, "dimmed", True)
+            self.note_buttons.append(note_btn)
+        self.place_note_cards(start)
+
+    def pending_card_count(self):
+        return len(self.pending_note_ids) - self.pending_position
+
+    def schedule_card_build(self):
+        if not self.card_build_scheduled:
+            self.card_build_scheduled = True
+            QTimer.singleShot(0, self.build_pending_cards)
+
+    def build_pending_cards(self, chunk_size=CARD_CHUNK_SIZE):
+        self.card_build_scheduled = False
+        if not self.pending_card_count():
+            return
+        stop = min(self.pending_position + chunk_size, len(self.pending_note_ids))
+        self.build_note_cards(self.pending_note_ids[self.pending_position:stop])
+        self.pending_position = stop
+        if self.pending_card_count():
+            self.schedule_card_build()
+        else:
+            self.pending_note_ids = []
+            self.pending_position = 0
+            self.pending_dimmed = set()
+            self.cards_built.emit()
+
+    def ensure_note_cards(self):
+        # точкові зміни сітки працюють з повним списком карток, тому решта добудовується одразу
+        if self.pending_card_count():
+            self.build_pending_cards(self.pending_card_count())
+
+    def update_grid_columns(self):
         viewport_width = self.scroll_area.viewport().width()
         total_width = viewport_width - 40
         note_width, _ = self.current_style['note_size']
@@ -129,79 +241,201 @@ class MainPage(QWidget):
             spacing = min_spacing
         self.notes_layout.setSpacing(spacing)
         self.notes_layout.setContentsMargins(20, 20, 20, 20)
-        for display_idx, value in enumerate(notes_or_indices):
-            real_note_index = value if isinstance(value, int) else display_idx
-            if real_note_index in expanded_indices:
+        changed = max_columns != self.grid_columns
+        self.grid_columns = max_columns
+        return changed
+
+    def create_note_card(self, note_id):
+        note_btn = DraggableNoteButton(note_id, on_click_callback=self.handle_note_click,
+                                       render_pixmap=self.card_pixmap)
+        note_width, note_height = self.current_style['note_size']
+        note_btn.setFixedSize(note_width, note_height)
+        note_btn.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        note_btn.customContextMenuRequested.connect(
+            self.make_context_menu_handler(note_btn, note_id))
+        note_btn.setObjectName("noteCard")
+        note_btn.setLayout(QVBoxLayout())
+        self.fill_note_card(note_btn)
+        self.note_cards[note_id] = note_btn
+        return note_btn
+
+    def card_padding(self):
+        return int(self.current_style['button_padding'].replace('px', ''))
+
+    def restyle_note_card(self, note_btn):
+        # шрифт картки задає таблиця стилів сторінки, тож на місці оновлюються лише розмір і відступи
+        note_width, note_height = self.current_style['note_size']
+        note_btn.setFixedSize(note_width, note_height)
+        item = note_btn.layout().itemAt(0)
+        if item is not None and item.widget() is not None:
+            padding = self.card_padding()
+            item.widget().layout().setContentsMargins(padding, padding, padding, padding)
+
+    def fill_note_card(self, note_btn):
+        note_id = note_btn.note_id
+        card_layout = note_btn.layout()
+        while card_layout.count():
+            item = card_layout.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
+        content_container = QWidget()
+        content_layout = QVBoxLayout(content_container)
+        content_layout.setSpacing(5)
+        padding = self.card_padding()
+        content_layout.setContentsMargins(padding, padding, padding, padding)
+        title = self.backend.get_note_title(note_id)
+        preview = self.backend.get_note_preview(note_id)
+        tags = self.backend.get_note_tags(note_id)
+        title_label = QLabel(f"<b>{title or 'Без назви'}</b>")
+        title_label.setObjectName("noteTitle")
+        title_label.setWordWrap(True)
+        content_layout.addWidget(title_label)
+        content_label = QLabel(preview_text(preview))
+        content_label.setObjectName("noteContent")
+        content_label.setWordWrap(True)
+        content_layout.addWidget(content_label)
+        if tags:
+            tags_layout = QHBoxLayout()
+            tags_layout.setSpacing(5)
+            tags_layout.setContentsMargins(0, 0, 0, 0)
+            tag_colors = self.backend.get_tag_colors()
+            for tag in tags.split():
+                tag_label = QLabel(tag)
+                tag_without_hash = tag.lstrip('#')
+                tag_label.setStyleSheet(Styles.get_tag_label_style(tag_colors.get(tag_without_hash, '#dddddd')))
+                tags_layout.addWidget(tag_label)
+            tag_container = QWidget()
+            tag_container.setLayout(tags_layout)
+            content_layout.addWidget(tag_container)
+        card_layout.addWidget(content_container)
+        self.card_signatures[note_id] = self.card_signature(note_id)
+        self.card_snippets.pop(note_id, None)
+
+    def card_signature(self, note_id):
+        note = self.backend.get_note(note_id)
+        return (note["title"], self.backend.get_note_preview(note_id), note["tags"])
+
+    def display_buttons(self):
+        if not self.ranked_ids:
+            return self.note_buttons
+        first = [self.note_cards[note_id] for note_id in self.ranked_ids if note_id in self.note_cards]
+        ranked = set(self.ranked_ids)
+        return first + [btn for btn in self.note_buttons if btn.note_id not in ranked]
+
+    def place_note_cards(self, start, stop=None):
+        buttons = self.display_buttons()
+        if buttons is not self.note_buttons:
+            # ранжований порядок не збігається з порядком нотаток, тож будь-яка зміна зсуває всю сітку
+            start, stop = 0, None
+        stop = len(buttons) if stop is None else stop
+        for display_idx in range(start, stop):
+            note_btn = buttons[display_idx]
+            cell = divmod(display_idx, self.grid_columns)
+            if self.card_cells.get(note_btn.note_id) == cell:
                 continue
-            note_btn = DraggableNoteButton(real_note_index, on_click_callback=self.handle_note_click)
-            note_width, note_height = self.current_style['note_size']
-            note_btn.setFixedSize(note_width, note_height)
-            note_btn.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-            note_btn.customContextMenuRequested.connect(
-                self.make_context_menu_handler(note_btn, real_note_index))
-            note_btn.setStyleSheet(Styles.get_note_wrapper_style(self.is_dark_mode))
-            content_container = QWidget()
-            content_layout = QVBoxLayout(content_container)
-            content_layout.setSpacing(5)
-            padding = int(self.current_style['button_padding'].replace('px', ''))
-            content_layout.setContentsMargins(padding, padding, padding, padding)
-            title = self.backend.get_note_title(real_note_index)
-            content = notes[real_note_index]
-            tags = self.backend.get_note_tags(real_note_index)
-            title_label = QLabel(f"<b>{title or 'Без назви'}</b>")
-            title_label.setWordWrap(True)
-            title_label.setStyleSheet(Styles.get_note_title_label_style(self.is_dark_mode, self.current_style['note_font']))
-            content_layout.addWidget(title_label)
-            content_label = QLabel(content[:60] + "..." if len(content) > 60 else content)
-            content_label.setWordWrap(True)
-            content_label.setStyleSheet(Styles.get_note_content_label_style(self.is_dark_mode, self.current_style['note_font']))
-            content_layout.addWidget(content_label)
-            if tags:
-                tags_layout = QHBoxLayout()
-                tags_layout.setSpacing(5)
-                tags_layout.setContentsMargins(0, 0, 0, 0)
-                for tag in tags.split():
-                    tag_label = QLabel(tag)
-                    tag_without_hash = tag.lstrip('#')
-                    tag_colors = self.backend.get_tag_colors()
-                    tag_label.setStyleSheet(Styles.TAG_LABEL_STYLE.format(
-                        color=tag_colors.get(tag_without_hash, '#dddddd')))
-                    tags_layout.addWidget(tag_label)
-                tag_container = QWidget()
-                tag_container.setLayout(tags_layout)
-                content_layout.addWidget(tag_container)
-            note_btn.setLayout(QVBoxLayout())
-            note_btn.layout().addWidget(content_container)
-            row, col = divmod(display_idx, max_columns)
-            self.notes_layout.addWidget(note_btn, row, col)
-            self.note_buttons.append(note_btn)
+            self.notes_layout.removeWidget(note_btn)
+            self.notes_layout.addWidget(note_btn, *cell)
+            self.card_cells[note_btn.note_id] = cell
+
+    def discard_note_card(self, note_id):
+        note_btn = self.note_cards.pop(note_id)
+        self.card_signatures.pop(note_id, None)
+        self.card_cells.pop(note_id, None)
+        self.card_snippets.pop(note_id, None)
+        self.dimmed_ids.discard(note_id)
+        self.notes_layout.removeWidget(note_btn)
+        note_btn.setParent(None)
+        note_btn.deleteLater()
+
+    def sync_note_cards(self):
+        self.ensure_note_cards()
+        if self.notes_view:
+            self.notes_view.notes_model.refresh()
+            return
+        note_ids = self.backend.note_ids()
+        alive = set(note_ids)
+        for note_id in [note_id for note_id in self.note_cards if note_id not in alive]:
+            self.discard_note_card(note_id)
+        # нові нотатки в кінці списку (як після імпорту) отримують картки порціями, як під час запуску
+        known = len(note_ids)
+        while known and note_ids[known - 1] not in self.note_cards:
+            known -= 1
+        note_buttons = []
+        for note_id in note_ids[:known]:
+            note_btn = self.note_cards.get(note_id)
+            if note_btn is None:
+                note_btn = self.create_note_card(note_id)
+            elif self.card_signatures.get(note_id) != self.card_signature(note_id):
+                self.fill_note_card(note_btn)
+            note_buttons.append(note_btn)
+        self.note_buttons = note_buttons
+        self.place_note_cards(0)
+        if known < len(note_ids):
+            self.pending_note_ids = list(note_ids[known:])
+            self.pending_position = 0
+            self.schedule_card_build()
+        self.snippet_timer.start(50)
+
+    def refresh_note_card(self, note_id):
+        self.ensure_note_cards()
+        if self.notes_view:
+            self.notes_view.notes_model.note_changed(self.backend.index_of(note_id))
+            return
+        note_btn = self.note_cards.get(note_id)
+        if note_btn is not None and self.card_signatures.get(note_id) != self.card_signature(note_id):
+            self.fill_note_card(note_btn)
+        if note_btn is not None and self.snippet_query:
+            # перезаповнена картка втратила фрагмент, а збіги могли змінитися й там, де початок тексту лишився тим самим
+            self.card_snippets[note_id] = (None, None)
+            self.snippet_timer.start(50)
+
+    def insert_note_card(self, note_id):
+        self.ensure_note_cards()
+        if self.notes_view:
+            self.notes_view.notes_model.refresh()
+            return
+        index = self.backend.index_of(note_id)
+        self.note_buttons.insert(index, self.create_note_card(note_id))
+        self.place_note_cards(index)
+
+    def remove_note_card(self, note_id, index):
+        self.ensure_note_cards()
+        if self.notes_view:
+            self.notes_view.notes_model.refresh()
+            return
+        if note_id not in self.note_cards:
+            return
+        del self.note_buttons[index]
+        self.discard_note_card(note_id)
+        self.place_note_cards(index)
+
+    def move_note_card(self, source_index, target_index):
+        self.ensure_note_cards()
+        if self.notes_view:
+            self.notes_view.notes_model.refresh()
+            return
+        self.note_buttons.insert(target_index, self.note_buttons.pop(source_index))
+        self.place_note_cards(min(source_index, target_index), max(source_index, target_index) + 1)
 
     def add_new_note(self):
-        self.backend.add_note()
-        self.arrange_notes(self.backend.get_notes())
-        self.expand_note_view(len(self.backend.get_notes()) - 1, editable=True)
+        note_id = self.backend.add_note()
+        self.insert_note_card(note_id)
+        self.expand_note_view(note_id, editable=True)
 
-    def handle_note_click(self, event, index):
-        note_index = getattr(index, 'real_note_index', index)
+    def handle_note_click(self, event, note_id):
         if event.button() == Qt.MouseButton.LeftButton:
-            self.expand_note_view(note_index, editable=False)
+            self.expand_note_view(note_id, editable=False)
         elif event.button() == Qt.MouseButton.RightButton:
-            self.show_context_menu(event.globalPosition().toPoint(), note_index)
+            self.show_context_menu(event.globalPosition().toPoint(), note_id)
 
-    def expand_note_view(self, index, editable=False):
-        if index in self.expanded_notes:
+    def expand_note_view(self, note_id, editable=False):
+        if note_id in self.expanded_notes:
             return
         self.ignore_resize = True
         try:
-            display_index = None
-            for idx, btn in enumerate(self.note_buttons):
-                if btn.real_note_index == index:
-                    display_index = idx
-                    break
-            if display_index is None:
+            start_rect = self.hide_note_card(note_id)
+            if start_rect is None:
                 return
-            note_btn = self.note_buttons[display_index]
-            note_btn.setVisible(False)
             parent_rect = self.rect()
             parent_center = parent_rect.center()
             note_width = int(parent_rect.width() * 0.6)
@@ -210,25 +444,23 @@ class MainPage(QWidget):
             expanded_note.setObjectName("expandedNote")
             expanded_note.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
             expanded_note.setStyleSheet(Styles.get_expanded_note_style(self.is_dark_mode))
-            start_pos = note_btn.mapTo(self, QPoint(0, 0))
-            expanded_note.setGeometry(QRect(start_pos, note_btn.size()))
             layout = QVBoxLayout(expanded_note)
             layout.setContentsMargins(20, 20, 20, 20)
             title_edit = QLineEdit()
             title_edit.setPlaceholderText("Назва нотатки")
-            title_edit.setText(self.backend.get_note_title(index))
+            title_edit.setText(self.backend.get_note_title(note_id))
             title_edit.setReadOnly(not editable)
             title_edit.setStyleSheet(Styles.get_expanded_note_input_style(self.is_dark_mode))
             layout.addWidget(title_edit)
             text_edit = QTextEdit()
-            text_edit.setText(self.backend.get_notes()[index])
+            text_edit.setText(self.backend.get_note_content(note_id))
             text_edit.setReadOnly(not editable)
             text_edit.setStyleSheet(Styles.get_expanded_note_input_style(self.is_dark_mode))
             layout.addWidget(text_edit)
             tags_layout = QHBoxLayout()
             tags_edit = QLineEdit()
             tags_edit.setPlaceholderText("Теги")
-            tags_edit.setText(self.backend.get_note_tags(index))
+            tags_edit.setText(self.backend.get_note_tags(note_id))
             tags_edit.setReadOnly(not editable)
             tags_edit.setStyleSheet(Styles.get_expanded_note_input_style(self.is_dark_mode))
             tags_layout.addWidget(tags_edit)
@@ -247,59 +479,96 @@ class MainPage(QWidget):
                 tag_without_hash = tag.lstrip('#')
                 color = tag_colors.get(tag_without_hash, '#dddddd')
                 tag_label = QLabel(tag)
-                tag_label.setStyleSheet(Styles.TAG_LABEL_STYLE.format(color=color))
+                tag_label.setStyleSheet(Styles.get_tag_label_style(color))
                 tags_display_layout.addWidget(tag_label)
             layout.addLayout(tags_display_layout)
             buttons_layout = QHBoxLayout()
             if editable:
                 save_btn = QPushButton("Зберегти")
                 save_btn.clicked.connect(
-                    lambda: self.save_note(index, expanded_note, title_edit, text_edit, tags_edit))
+                    lambda: self.save_note(note_id, expanded_note, title_edit, text_edit, tags_edit))
                 save_btn.setStyleSheet(Styles.get_tag_button_style(self.is_dark_mode))
                 buttons_layout.addWidget(save_btn)
             close_btn = QPushButton("Закрити")
-            close_btn.clicked.connect(lambda: self.collapse_note(index))
+            close_btn.clicked.connect(lambda: self.collapse_note(note_id))
             close_btn.setStyleSheet(Styles.get_tag_button_style(self.is_dark_mode))
             buttons_layout.addWidget(close_btn)
             layout.addLayout(buttons_layout)
-            expanded_note.show()
-            self.expanded_notes[index] = expanded_note
+            self.expanded_notes[note_id] = expanded_note
             final_x = parent_center.x() - note_width // 2
             final_y = parent_center.y() - note_height // 2
             final_rect = QRect(final_x, final_y, note_width, note_height)
-            animation = QPropertyAnimation(expanded_note, b"geometry")
+            expanded_note.setGeometry(final_rect)
+            # анімується готовий растр картки, а редактор з'являється вже в кінцевому розмірі
+            start_frame = QLabel(self)
+            start_frame.setPixmap(self.card_pixmap(note_id))
+            start_frame.setScaledContents(True)
+            start_frame.setGeometry(start_rect)
+            start_frame.show()
+            animation = QPropertyAnimation(start_frame, b"geometry")
             animation.setDuration(200)
-            animation.setStartValue(QRect(start_pos, note_btn.size()))
+            animation.setStartValue(start_rect)
             animation.setEndValue(final_rect)
+            animation.finished.connect(lambda: self.finish_expand(note_id, expanded_note, start_frame))
             animation.start()
             self.animation = animation
         finally:
             self.ignore_resize = False
 
-    def save_note(self, index, expanded_note, title_edit, text_edit, tags_edit):
-        self.backend.update_note(index, text_edit.toPlainText(), title_edit.text(), tags_edit.text())
-        self.collapse_note(index)
-        self.arrange_notes(self.backend.get_notes())
+    def finish_expand(self, note_id, expanded_note, start_frame):
+        start_frame.deleteLater()
+        if self.expanded_notes.get(note_id) is expanded_note:
+            expanded_note.show()
+            expanded_note.raise_()
+
+    def card_pixmap(self, note_id):
+        note = self.backend.note_at(self.backend.index_of(note_id))
+        if note is None:
+            return None
+        return self.card_cache.pixmap(note, self.is_dark_mode, self.size_class, self.font(), self.devicePixelRatioF())
 
-    def collapse_note(self, index):
-        if index in self.expanded_notes:
-            expanded_note = self.expanded_notes.pop(index)
+    def hide_note_card(self, note_id):
+        self.ensure_note_cards()
+        if self.notes_view:
+            index = self.backend.index_of(note_id)
+            if index < 0:
+                return None
+            card_rect = self.notes_view.card_rect(self.notes_view.notes_model.row_of(index))
+            self.notes_view.notes_model.set_hidden(note_id, True)
+            viewport = self.notes_view.viewport()
+            return QRect(viewport.mapTo(self, card_rect.topLeft()), card_rect.size())
+        btn = self.note_cards.get(note_id)
+        if btn is None:
+            return None
+        btn.setVisible(False)
+        return QRect(btn.mapTo(self, QPoint(0, 0)), btn.size())
+
+    def save_note(self, note_id, expanded_note, title_edit, text_edit, tags_edit):
+        self.backend.update_note(note_id, text_edit.toPlainText(), title_edit.text(), tags_edit.text())
+        self.collapse_note(note_id)
+        self.refresh_note_card(note_id)
+
+    def collapse_note(self, note_id):
+        if note_id in self.expanded_notes:
+            expanded_note = self.expanded_notes.pop(note_id)
             expanded_note.close()
-            for btn in self.note_buttons:
-                if btn.real_note_index == index:
-                    btn.setVisible(True)
-                    break
+            if self.notes_view:
+                self.notes_view.notes_model.set_hidden(note_id, False)
+                return
+            btn = self.note_cards.get(note_id)
+            if btn is not None:
+                btn.setVisible(True)
 
-    def make_context_menu_handler(self, note_btn, index):
+    def make_context_menu_handler(self, note_btn, note_id):
         def handler(pos):
             global_pos = note_btn.mapToGlobal(pos)
-            self.show_context_menu(global_pos, index)
+            self.show_context_menu(global_pos, note_id)
         return handler
 
-    def show_context_menu(self, global_pos: QPoint, index: int):
-        menu = CustomContextMenu(self, note_index=index)
-        menu.edit_btn.clicked.connect(lambda: (menu.close(), self.expand_note_view(index, editable=True)))
-        menu.delete_btn.clicked.connect(lambda: (menu.close(), self.delete_note(index)))
+    def show_context_menu(self, global_pos: QPoint, note_id: str):
+        menu = CustomContextMenu(self, note_id=note_id)
+        menu.edit_btn.clicked.connect(lambda: (menu.close(), self.expand_note_view(note_id, editable=True)))
+        menu.delete_btn.clicked.connect(lambda: (menu.close(), self.delete_note(note_id)))
         main_geom = self.window().geometry()
         menu_size = menu.sizeHint()
         x, y = global_pos.x(), global_pos.y()
@@ -314,10 +583,18 @@ class MainPage(QWidget):
         menu.move(x, y)
         menu.show()
 
-    def delete_note(self, index):
-        del self.backend.notes[index]
-        self.backend.save_notes()
-        self.arrange_notes(self.backend.get_notes())
+    def delete_note(self, note_id):
+        self.collapse_note(note_id)
+        index = self.backend.index_of(note_id)
+        self.backend.delete_note(note_id)
+        self.remove_note_card(note_id, index)
+
+    def move_note(self, note_id, target_index):
+        source_index = self.backend.index_of(note_id)
+        self.backend.move_note(note_id, target_index)
+        target_index = self.backend.index_of(note_id)
+        if target_index != source_index:
+            self.move_note_card(source_index, target_index)
 
     def showEvent(self, event):
         super().showEvent(event)
@@ -363,20 +640,28 @@ class MainPage(QWidget):
     def handle_resize_timeout(self):
         if self.pending_size is None:
             return
-        width = self.pending_size.width()
-        if width < 800:
-            new_style = Styles.SCREEN_STYLES['small']
-        elif width < 1200:
-            new_style = Styles.SCREEN_STYLES['medium']
-        else:
-            new_style = Styles.SCREEN_STYLES['large']
+        size_class = Styles.screen_size_class(self.pending_size.width())
+        style_changed = size_class != self.size_class
+        new_style = Styles.SCREEN_STYLES[size_class]
+        self.size_class = size_class
         self.current_style = new_style
+        if style_changed:
+            self.apply_page_style()
         note_width, note_height = new_style['note_size']
-        spacing = int(new_style['spacing'].replace('px', ''))
-        self.notes_layout.setSpacing(spacing)
-        available_width = width - 100
-        new_columns = max(1, available_width // (note_width + spacing))
-        self.arrange_notes(self.backend.get_notes())
+        if self.notes_view:
+            self.notes_view.set_screen_style(new_style, size_class)
+        elif not self.ignore_resize:
+            if style_changed:
+                # заново заповнюються лише видимі картки, решта змінює розмір і відступи на місці
+                for note_btn in self.note_buttons:
+                    visible = not note_btn.visibleRegion().isEmpty()
+                    self.restyle_note_card(note_btn)
+                    if visible:
+                        self.fill_note_card(note_btn)
+            # при зміні розміру картки лише переставляються в сітці, без перестворення
+            if self.update_grid_columns():
+                self.place_note_cards(0)
+            self.snippet_timer.start(50)
         self.add_button.setFixedSize(note_width * 2, note_height // 2)
         self.pending_size = None
 
@@ -400,10 +685,7 @@ class MainPage(QWidget):
             self.clear_highlight()
             self.highlighted_index = new_index
             if new_index is not None and new_index < len(self.note_buttons):
-                target_btn = self.note_buttons[new_index]
-                opacity_effect = QGraphicsOpacityEffect(target_btn)
-                opacity_effect.setOpacity(0.6)
-                target_btn.setGraphicsEffect(opacity_effect)
+                self.set_card_state(self.note_buttons[new_index], "dropTarget", True)
 
     def dragLeaveEvent(self, event):
         self.clear_all_highlights()
@@ -411,65 +693,108 @@ class MainPage(QWidget):
         event.accept()
 
     def dropEvent(self, event):
-        source_index = int(event.mimeData().text())
+        source_id = event.mimeData().text()
         self.clear_all_highlights()
         self.highlighted_index = None
         drop_pos = event.position().toPoint()
-        target_index = self.find_drop_target_index(drop_pos)
-        if (
-            target_index is not None
-            and target_index != source_index
-            and 0 <= source_index < len(self.backend.notes)
-            and 0 <= target_index <= len(self.backend.notes)
-        ):
-            note = self.backend.notes.pop(source_index)
-            self.backend.notes.insert(target_index, note)
-            self.backend.save_notes()
-            self.arrange_notes(self.backend.get_notes())
+        target_button = self.find_drop_target_index(drop_pos)
+        if target_button is not None and self.backend.get_note(source_id) is not None:
+            target_index = self.backend.index_of(self.note_buttons[target_button].note_id)
+            if target_index != self.backend.index_of(source_id):
+                self.move_note(source_id, target_index)
         event.acceptProposedAction()
 
     def clear_highlight(self):
         if self.highlighted_index is not None and self.highlighted_index < len(self.note_buttons):
-            btn = self.note_buttons[self.highlighted_index]
-            btn.setGraphicsEffect(None)
+            self.set_card_state(self.note_buttons[self.highlighted_index], "dropTarget", False)
 
     def clear_all_highlights(self):
-        for btn in self.note_buttons:
-            btn.setGraphicsEffect(None)
-
-    def filter_notes(self, search_text, search_tag=None):
-        search_text = search_text.lower()
-        matches = []
-        notes = self.backend.get_notes()
-        for i, note in enumerate(notes):
-            title = self.backend.get_note_title(i).lower()
-            content = note.lower()
-            tags = self.backend.get_note_tags(i).lower()
-            text_match = not search_text or search_text in title or search_text in content
-            tag_match = not search_tag or search_tag.lower() in tags
-            matches.append(text_match and tag_match)
-        self.update_notes_opacity(matches)
+        self.clear_highlight()
+
+    def set_card_state(self, btn, name, value):
+        # стан картки задається динамічною властивістю, а вигляд — правилами спільної таблиці стилів
+        btn.setProperty(name, value)
+        for widget in [btn] + btn.findChildren(QLabel):
+            widget.style().unpolish(widget)
+            widget.style().polish(widget)
+
+    def set_ranked_search(self, enabled):
+        self.searcher.ranked = enabled
+        if not enabled:
+            self.apply_ranking(None)
+
+    def set_fuzzy_search(self, enabled):
+        self.searcher.fuzzy = enabled
+
+    def apply_ranking(self, note_ids):
+        note_ids = list(note_ids or [])
+        if note_ids == self.ranked_ids:
+            return
+        self.ranked_ids = note_ids
+        if self.notes_view:
+            self.notes_view.notes_model.set_ranking(note_ids)
+            self.notes_view.scrollToTop()
+            return
+        self.ensure_note_cards()
+        self.place_note_cards(0)
+        self.scroll_area.verticalScrollBar().setValue(0)
+        self.snippet_timer.start(0)
+
+    def filter_notes(self, search_text, search_tag=None, immediate=True):
+        self.searcher.request(search_text, search_tag, immediate=immediate)
 
     def filter_notes_by_tag(self, search_tag):
-        search_tag = search_tag.strip().lower()
-        matches = []
-        notes = self.backend.get_notes()
-        if not search_tag:
-            matches = [True] * len(notes)
-        else:
-            for i, _ in enumerate(notes):
-                tags = self.backend.get_note_tags(i).lower()
-                matches.append(search_tag in tags)
-        self.update_notes_opacity(matches)
+        self.searcher.request("", search_tag.strip(), immediate=True)
 
     def update_notes_opacity(self, matches):
+        self.snippet_query = self.searcher.query[0]
+        if self.notes_view:
+            self.notes_view.notes_model.set_matches(matches, self.snippet_query)
+            return
+        # збудовані картки йдуть на початку в порядку нотаток, за ними — ті, що ще чекають на побудову
+        built = len(self.note_buttons)
+        self.pending_dimmed = {note_id for note_id, is_match
+                               in zip(self.pending_note_ids[self.pending_position:], matches[built:])
+                               if not is_match}
         for btn, is_match in zip(self.note_buttons, matches):
-            opacity_effect = QGraphicsOpacityEffect(btn)
-            opacity_effect.setOpacity(1.0 if is_match else 0.3)
-            btn.setGraphicsEffect(opacity_effect)
+            if is_match == (btn.note_id in self.dimmed_ids):
+                if is_match:
+                    self.dimmed_ids.discard(btn.note_id)
+                else:
+                    self.dimmed_ids.add(btn.note_id)
+                self.set_card_state(btn, "dimmed", not is_match)
+        self.update_card_snippets()
+
+    def update_card_snippets(self):
+        # фрагменти зі збігами рахуються лише для видимих карток; решта повертається до початку тексту
+        # і отримає свій фрагмент, коли її прокрутять у видиму область
+        if self.notes_view:
+            return
+        wanted = (self.snippet_query, self.is_dark_mode)
+        for btn in self.note_buttons:
+            note_id = btn.note_id
+            shown = self.card_snippets.get(note_id)
+            if self.snippet_query and note_id not in self.dimmed_ids and not btn.visibleRegion().isEmpty():
+                if shown != wanted:
+                    self.set_card_snippet(btn, self.backend.get_note_snippet(note_id, self.snippet_query))
+                    self.card_snippets[note_id] = wanted
+            elif shown is not None and (shown != wanted or note_id in self.dimmed_ids):
+                self.set_card_snippet(btn, None)
+                del self.card_snippets[note_id]
+
+    def set_card_snippet(self, btn, snippet):
+        label = btn.findChild(QLabel, "noteContent")
+        if label is None:
+            return
+        if snippet is None:
+            label.setTextFormat(Qt.TextFormat.AutoText)
+            label.setText(preview_text(self.backend.get_note_preview(btn.note_id)))
+        else:
+            label.setTextFormat(Qt.TextFormat.RichText)
+            label.setText(snippet_html(snippet, Styles.get_theme_styles(self.is_dark_mode)['highlight']))
 
     def get_note_content(self, save_function):
-        for index, expanded_note in self.expanded_notes.items():
+        for note_id, expanded_note in self.expanded_notes.items():
             text_edits = expanded_note.findChildren(QTextEdit)
             if text_edits:
                 content = text_edits[0].toPlainText()
@@ -477,27 +802,23 @@ class MainPage(QWidget):
                 return
         for btn in self.note_buttons:
             if not btn.isVisible():
-                content = self.backend.get_notes()[btn.real_note_index]
+                content = self.backend.get_note_content(btn.note_id)
                 save_function(content)
                 return
         if self.note_buttons:
-            content = self.backend.get_notes()[self.note_buttons[0].real_note_index]
+            content = self.backend.get_note_content(self.note_buttons[0].note_id)
             save_function(content)
+        elif self.notes_view and self.backend.note_count():
+            save_function(self.backend.get_note_content(self.backend.note_id_at(0)))
 
     def update_theme(self, is_dark_mode):
         self.is_dark_mode = is_dark_mode
-        self.setStyleSheet(Styles.get_main_style(is_dark_mode))
-        self.scroll_area.setStyleSheet(Styles.get_scroll_area_style(is_dark_mode))
-        theme = Styles.get_theme_styles(is_dark_mode)
+        self.apply_page_style()
+        if self.notes_view:
+            self.notes_view.set_dark_mode(is_dark_mode)
+        else:
+            self.update_card_snippets()
         tag_colors = self.backend.get_tag_colors()
-        for btn in self.note_buttons:
-            btn.setStyleSheet(Styles.get_note_wrapper_style(is_dark_mode))
-            for label in btn.findChildren(QLabel):
-                tag_text = label.text().lstrip('#')
-                if tag_text in tag_colors:
-                    label.setStyleSheet(Styles.TAG_LABEL_STYLE.format(color=tag_colors[tag_text]))
-                else:
-                    label.setStyleSheet(Styles.get_note_content_label_style(is_dark_mode, self.current_style['note_font']))
         for expanded_note in self.expanded_notes.values():
             expanded_note.setStyleSheet(Styles.get_expanded_note_style(is_dark_mode))
             for widget in expanded_note.findChildren((QLineEdit, QTextEdit)):
@@ -505,7 +826,7 @@ class MainPage(QWidget):
             for label in expanded_note.findChildren(QLabel):
                 tag_text = label.text().lstrip('#')
                 if tag_text in tag_colors:
-                    label.setStyleSheet(Styles.TAG_LABEL_STYLE.format(color=tag_colors[tag_text]))
+                    label.setStyleSheet(Styles.get_tag_label_style(tag_colors[tag_text]))
                 else:
                     label.setStyleSheet(Styles.get_note_content_label_style(is_dark_mode, self.current_style['note_font']))
         self.add_button.setStyleSheet(Styles.get_floating_add_button_style(is_dark_mode))
@@ -523,7 +844,7 @@ class MainPage(QWidget):
             layout = QHBoxLayout(widget)
             layout.setContentsMargins(8, 4, 8, 4)
             label = QLabel(f"#{tag_name}")
-            label.setStyleSheet(Styles.TAG_LABEL_STYLE.format(color=color))
+            label.setStyleSheet(Styles.get_tag_label_style(color))
             layout.addWidget(label)
             tag_label.setDefaultWidget(widget)
             menu.addAction(tag_label)
@@ -541,11 +862,11 @@ class MainPage(QWidget):
         return None
 
 class DraggableNoteButton(QPushButton):
-    def __init__(self, index, on_click_callback=None, parent=None):
+    def __init__(self, note_id, on_click_callback=None, render_pixmap=None, parent=None):
         super().__init__(parent)
-        self.index = index
-        self.real_note_index = index
+        self.note_id = note_id
         self.on_click_callback = on_click_callback
+        self.render_pixmap = render_pixmap
         self.setAcceptDrops(True)
         self.start_pos = None
         self.drag_preview = None
@@ -561,9 +882,9 @@ class DraggableNoteButton(QPushButton):
             if distance >= QApplication.startDragDistance():
                 drag = QDrag(self)
                 mime_data = QMimeData()
-                mime_data.setText(str(self.real_note_index))
+                mime_data.setText(self.note_id)
                 drag.setMimeData(mime_data)
-                drag.setPixmap(self.grab())
+                drag.setPixmap(self.card_pixmap())
                 drag.exec()
                 self.start_pos = None
         super().mouseMoveEvent(event)
@@ -573,16 +894,20 @@ class DraggableNoteButton(QPushButton):
             distance = (event.position().toPoint() - self.start_pos).manhattanLength()
             if distance < QApplication.startDragDistance():
                 if self.on_click_callback:
-                    self.on_click_callback(event, self.real_note_index)
+                    self.on_click_callback(event, self.note_id)
         self.start_pos = None
         super().mouseReleaseEvent(event)
 
+    def card_pixmap(self):
+        pixmap = self.render_pixmap(self.note_id) if self.render_pixmap else None
+        return pixmap if pixmap is not None else self.grab()
+
     def create_drag_preview(self):
         preview = QLabel(self.window())
         preview.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
         preview.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.ToolTip)
         preview.setStyleSheet("border: 2px solid #aaa; border-radius: 15px;")
-        preview.setPixmap(self.grab())
+        preview.setPixmap(self.card_pixmap())
         preview.setFixedSize(self.size())
         return preview
     
@@ -660,9 +985,9 @@ class TagSelectorDialog(QDialog):
 
 
 class CustomContextMenu(QWidget):
-    def __init__(self, parent=None, note_index=None):
+    def __init__(self, parent=None, note_id=None):
         super().__init__(parent)
-        self.note_index = note_index
+        self.note_id = note_id
         self.setWindowFlags(Qt.WindowType.Popup | Qt.WindowType.FramelessWindowHint)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
         self.setWindowFlags(
@@ -696,15 +1021,15 @@ class CustomContextMenu(QWidget):
 
     def save_to_clipboard(self):
         parent = self.parent()
-        if parent and self.note_index is not None:
-            content = parent.backend.get_notes()[self.note_index]
+        if parent and self.note_id is not None:
+            content = parent.backend.get_note_content(self.note_id)
             parent.backend.save_to_clipboard(content)
         self.close()
 
     def save_to_file(self):
         parent = self.parent()
-        if parent and self.note_index is not None:
-            content = parent.backend.get_notes()[self.note_index]
+        if parent and self.note_id is not None:
+            content = parent.backend.get_note_content(self.note_id)
             parent.backend.save_to_file(content, parent)
         self.close()
 
@@ -713,7 +1038,7 @@ class CustomContextMenu(QWidget):
         if dialog.exec():
             date, time = dialog.get_datetime()
             dt = QDateTime(date, time)
-            note_text = self.parent().backend.get_notes()[self.note_index]
+            note_text = self.parent().backend.get_note_content(self.note_id)
             self.parent().reminder_manager.set_reminder(note_text, dt)
         self.close()
 
@@ -1,96 +1,35 @@
-from PyQt6.QtWidgets import QApplication, QFileDialog, QMessageBox
-from PyQt6.QtCore import QTimer, QDateTime
-from plyer import notification
-import json
-import sys
-import os
-
-def resource_path(relative_path):
-    if hasattr(sys, '_MEIPASS'):
-        return os.path.join(sys._MEIPASS, relative_path)
-    return os.path.join(os.path.abspath("."), relative_path)
-
-class NotesBackend:
-    def __init__(self, filename="notes.json", tags_file="tags.json"):
-        self.filename = resource_path(filename)
-        self.tags_file = resource_path(tags_file)
-        self.notes = self.load_notes()
-        self.tags = self.load_tags()
-
-    def load_notes(self):
-        try:
-            with open(self.filename, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                if all(isinstance(note, str) for note in data):
-                    return [{"title": "", "content": note, "tags": ""} for note in data]
-                return data
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+from PyQt6.QtWidgets import QApplication, QFileDialog, QProgressDialog
+from PyQt6.QtCore import Qt, QTimer, QDateTime, QObject, QRunnable, QThreadPool, QEventLoop, pyqtSignal
+from notes_core import NotesStore, ReminderBook
+import transfer
+
+MAX_TIMER_INTERVAL = 2 ** 31 - 1
 
-    def save_notes(self):
-        with open(self.filename, "w", encoding="utf-8") as file:
-            json.dump(self.notes, file, indent=4, ensure_ascii=False)
-
-    def get_notes(self):
-        return [note["content"] for note in self.notes] if self.notes else []
-
-    def get_note_title(self, index):
-        return self.notes[index]["title"] if 0 <= index < len(self.notes) else ""
-
-    def get_note_tags(self, index):
-        return self.notes[index]["tags"] if 0 <= index < len(self.notes) else ""
-
-    def add_note(self):
-        self.notes.append({
-            "title": "",
-            "content": "Нова нотатка",
-            "tags": ""
-        })
-        self.save_notes()
-
-    def update_note(self, index, content, title=None, tags=None):
-        if 0 <= index < len(self.notes):
-            self.notes[index]["content"] = content
-            if title is not None:
-                self.notes[index]["title"] = title
-            if tags is not None:
-                self.notes[index]["tags"] = tags
-            self.save_notes()
-
-    def load_tags(self):
-        try:
-            with open(self.tags_file, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                if isinstance(data, list) and all("name" in tag and "color" in tag for tag in data):
-                    return {tag["name"]: tag["color"] for tag in data}
-        except (FileNotFoundError, json.JSONDecodeError):
-            pass
-        return {
-            "запис": "#cccccc",
-            "важливо": "#ff9999",
-            "ідея": "#99ff99",
-            "робота": "#9999ff",
-            "особисте": "#ffcc99"
-        }
-
-    def save_tags(self):
-        with open(self.tags_file, "w", encoding="utf-8") as file:
-            json.dump(
-                [{"name": name, "color": color} for name, color in self.tags.items()],
-                file, ensure_ascii=False, indent=4
-            )
 
-    def get_tags(self):
-        return self.tags 
-    
-    def get_tag_colors(self):
-        return self.tags
+class TransferSignals(QObject):
+    progress = pyqtSignal(int, object)
+    finished = pyqtSignal()
 
-    def add_tag(self, name, color="#cccccc"):
-        if name not in self.tags:
-            self.tags[name] = color
-            self.save_tags()
 
+class TransferTask(QRunnable):
+    def __init__(self, func):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.func = func
+        self.signals = TransferSignals()
+        self.result = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.result = self.func(self.signals.progress.emit)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.signals.finished.emit()
+
+class NotesBackend(NotesStore):
+    # сховище, пошук і порядок нотаток живуть у notes_core без Qt, тут лише буфер обміну й діалоги
     def save_to_clipboard(self, text: str):
         try:
             clipboard = QApplication.clipboard()
@@ -109,83 +48,133 @@ class NotesBackend:
         except Exception as e:
             print(f"Помилка збереження файлу: {e}")
 
+    def _run_transfer(self, parent, label, func):
+        dialog = QProgressDialog(label, None, 0, 0, parent)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(300)
+
+        def progress(done, total):
+            dialog.setMaximum(total or 0)
+            dialog.setValue(done if total else 0)
+            dialog.setLabelText(f"{label} {done}" + (f" / {total}" if total else ""))
+
+        # уся робота йде у фоновому потоці, а GUI-потік тим часом лише малює діалог і отримує прогрес сигналами
+        task = TransferTask(func)
+        loop = QEventLoop()
+        task.signals.progress.connect(progress)
+        task.signals.finished.connect(loop.quit)
+        QThreadPool.globalInstance().start(task)
+        loop.exec()
+        dialog.close()
+        if task.error is not None:
+            raise task.error
+        return task.result
+
+    def export_notes(self, parent=None, note_ids=None):
+        try:
+            file_path, selected_filter = QFileDialog.getSaveFileName(
+                parent, "Експорт нотаток", "",
+                "JSON Lines (*.jsonl);;Zip-архів Markdown (*.zip);;Тека з файлами Markdown (*)")
+            if not file_path:
+                return 0
+            fmt = "markdown" if selected_filter.startswith("Тека") else transfer.detect_format(file_path)
+            count = self._run_transfer(parent, "Експорт нотаток...",
+                                       lambda progress: transfer.export_notes(self, file_path, fmt, note_ids, progress))
+            print(f"Експортовано нотаток: {count}")
+            return count
+        except Exception as e:
+            print(f"Помилка експорту нотаток: {e}")
+            return 0
+
+    def import_notes(self, parent=None, directory=False):
+        try:
+            if directory:
+                path = QFileDialog.getExistingDirectory(parent, "Імпорт нотаток з теки Markdown")
+            else:
+                path, _ = QFileDialog.getOpenFileName(
+                    parent, "Імпорт нотаток", "", "Нотатки (*.jsonl *.ndjson *.zip);;Усі файли (*)")
+            if not path:
+                return []
+            # нотатки готуються й індексуються у фоновому потоці, а до списку потрапляють уже тут, в GUI-потоці, разом
+            batch = self._run_transfer(parent, "Імпорт нотаток...",
+                                       lambda progress: self.stage_notes(transfer.read_notes(path, progress=progress)))
+            ids = self.publish_notes(batch)
+            print(f"Імпортовано нотаток: {len(ids)}")
+            return ids
+        except Exception as e:
+            print(f"Помилка імпорту нотаток: {e}")
+            return []
 
-REMINDERS_FILE = resource_path("reminders.json")
 
 class ReminderManager:
     def __init__(self, parent):
         self.parent = parent
-        self.timers = []
-        self.load_saved_reminders()
+        self.book = ReminderBook()
+        self._flush_pending = False
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._fire_due_reminders)
 
     def set_reminder(self, note_text: str, target_datetime: QDateTime):
         if QDateTime.currentDateTime() >= target_datetime:
             self._notify(note_text)
-        else:
-            self._save_reminder(note_text, target_datetime)
-            self._schedule_timer(note_text, target_datetime)
-
-    def _schedule_timer(self, note_text: str, target_datetime: QDateTime):
-        current = QDateTime.currentDateTime()
-        msecs_to_target = current.msecsTo(target_datetime)
-        
-        if msecs_to_target > 0:
-            timer = QTimer()
-            timer.setSingleShot(True)
-            timer.setInterval(msecs_to_target)
-            timer.timeout.connect(lambda: self._notify(note_text))
-            timer.start()
-            self.timers.append(timer)
+            return
+        due_msecs = target_datetime.toMSecsSinceEpoch()
+        self.book.add(note_text, due_msecs)
+        self._schedule_flush()
+        if self.book.next_due() == due_msecs:
+            self._arm_timer()
+
+    def cancel_reminder(self, reminder_id):
+        if self.book.cancel(reminder_id):
+            self._schedule_flush()
+        self._arm_timer()
+
+    def get_reminders(self):
+        return self.book.get_reminders()
+
+    def _arm_timer(self):
+        next_due = self.book.next_due()
+        if next_due is None:
+            self.timer.stop()
+            return
+        msecs_to_target = next_due - QDateTime.currentMSecsSinceEpoch()
+        self.timer.start(min(max(0, msecs_to_target), MAX_TIMER_INTERVAL))
+
+    def _fire_due_reminders(self):
+        due = self.book.pop_due(QDateTime.currentMSecsSinceEpoch())
+        if due:
+            self._schedule_flush()
+        for reminder in due:
+            self._notify(reminder["text"])
+        self._arm_timer()
 
     def _notify(self, note_text: str):
         try:
+            # plyer потрібен лише для сповіщень, тому не сповільнює запуск застосунку
+            from plyer import notification
             notification.notify(
                 title="Нагадування",
                 message=note_text[:100] + "..." if len(note_text) > 100 else note_text,
                 app_name="Нотатки",
                 timeout=10
             )
-            self._remove_reminder(note_text)
-            if self.parent.reminders_widget and self.parent.reminders_widget.isVisible():
-                self.parent.reminders_widget.update_reminders()
         except Exception as e:
             print(f"Помилка при відправці повідомлення: {e}")
+        reminders_widget = getattr(self.parent.window(), "reminders_widget", None)
+        if reminders_widget and reminders_widget.isVisible():
+            reminders_widget.update_reminders()
 
-    def _remove_reminder(self, note_text: str):
-        try:
-            data = self._load_all_reminders()
-            data = [r for r in data if r["text"] != note_text]
-            with open(REMINDERS_FILE, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Помилка при видаленні нагадування: {e}")
+    def _schedule_flush(self):
+        # кілька змін за один прохід циклу подій записуються на диск одним разом
+        if not self._flush_pending:
+            self._flush_pending = True
+            QTimer.singleShot(0, self.flush)
 
-    def _save_reminder(self, note_text: str, dt: QDateTime):
-        data = self._load_all_reminders()
-        data.append({
-            "text": note_text,
-            "datetime": dt.toString("yyyy-MM-ddTHH:mm:ss")
-        })
-        with open(REMINDERS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def flush(self):
+        self._flush_pending = False
+        self.book.save()
 
     def load_saved_reminders(self):
-        data = self._load_all_reminders()
-        current = QDateTime.currentDateTime()
-        
-        for reminder in data:
-            try:
-                dt = QDateTime.fromString(reminder["datetime"], "yyyy-MM-ddTHH:mm:ss")
-                if current < dt:
-                    self._schedule_timer(reminder["text"], dt)
-            except Exception as e:
-                print(f"Помилка при завантаженні нагадування: {e}")
-
-    def _load_all_reminders(self):
-        if os.path.exists(REMINDERS_FILE):
-            try:
-                with open(REMINDERS_FILE, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                return []
-        return []
+        self.book.load(QDateTime.currentMSecsSinceEpoch())
+        self._arm_timer()
@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from storage import STORAGE_ENGINES
+
+UK_WORDS = [
+    "нотатка", "зустріч", "проєкт", "диплом", "робота", "ідея", "завдання", "список", "покупки", "молоко",
+    "хліб", "звіт", "дедлайн", "лекція", "семінар", "бібліотека", "книга", "стаття", "код", "помилка",
+    "перевірити", "зробити", "написати", "подзвонити", "відправити", "купити", "прочитати", "вивчити",
+    "сьогодні", "завтра", "тиждень", "місяць", "важливо", "терміново", "пізніше", "вечір", "ранок",
+    "київ", "львів", "університет", "викладач", "студент", "розклад", "іспит", "оцінка", "презентація",
+    "дані", "база", "сервер", "інтерфейс", "кнопка", "вікно", "пошук", "тег", "нагадування", "відпустка",
+    "квиток", "поїзд", "лікар", "спорт", "тренування", "рецепт", "борщ", "вареники", "подарунок", "свято",
+]
+
+EN_WORDS = [
+    "note", "meeting", "project", "thesis", "work", "idea", "task", "list", "shopping", "milk",
+    "bread", "report", "deadline", "lecture", "seminar", "library", "book", "article", "code", "bug",
+    "check", "fix", "write", "call", "send", "buy", "read", "learn", "today", "tomorrow", "week",
+    "month", "important", "urgent", "later", "evening", "morning", "review", "release", "server",
+    "database", "interface", "button", "window", "search", "tag", "reminder", "holiday", "ticket",
+    "train", "doctor", "sport", "workout", "recipe", "gift", "party", "budget", "invoice", "draft",
+]
+
+TAG_NAMES = [
+    "ідея", "робота", "особисте", "важливо", "запис", "диплом", "навчання", "покупки", "здоров'я", "спорт",
+    "подорожі", "книги", "фільми", "рецепти", "фінанси", "сім'я", "друзі", "проєкти", "код", "зустрічі",
+    "work", "personal", "todo", "reading", "ideas", "travel", "health", "finance", "study", "misc",
+]
+
+TAG_COUNT_WEIGHTS = [3, 4, 3, 2, 1]
+
+
+def generate_notebook(size, seed=0):
+    rng = random.Random(seed * 1000003 + size)
+    # популярність тегів спадає за законом Ципфа, як у реальних нотатках
+    tag_weights = [1 / rank for rank in range(1, len(TAG_NAMES) + 1)]
+    # дати створення беруться з окремого генератора, щоб решта даних для того самого seed не змінилася
+    dates = random.Random(seed)
+    now = datetime.now()
+    notes = []
+    for _ in range(size):
+        words = UK_WORDS if rng.random() < 0.7 else EN_WORDS
+        title = " ".join(rng.choices(words, k=rng.randint(1, 5))).capitalize()
+        sentences = []
+        for _ in range(rng.randint(1, 12)):
+            sentences.append(" ".join(rng.choices(words, k=rng.randint(4, 14))).capitalize() + ".")
+        tag_count = rng.choices(range(len(TAG_COUNT_WEIGHTS)), TAG_COUNT_WEIGHTS)[0]
+        tags = dict.fromkeys(rng.choices(TAG_NAMES, tag_weights, k=tag_count))
+        notes.append({
+            "title": title,
+            "content": " ".join(sentences),
+            "tags": " ".join("#" + tag for tag in tags),
+            "created": (now - timedelta(minutes=dates.randint(0, 60 * 24 * 365 * 3))).isoformat(timespec="seconds"),
+        })
+    tags = [{"name": name, "color": "#%06x" % rng.randrange(0x1000000)} for name in TAG_NAMES]
+    reminders = []
+    for _ in range(max(1, size // 20)):
+        due = now + timedelta(minutes=rng.randint(-60 * 24 * 30, 60 * 24 * 30))
+        reminders.append({
+            "text": rng.choice(notes)["content"][:200],
+            "datetime": due.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+    return notes, tags, reminders
+
+
+def write_notebook(workdir, notes, tags, reminders):
+    for name in ("notes.db", "notes.db-wal", "notes.db-shm", "notes.json.journal", "notes.index"):
+        path = os.path.join(workdir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    for name, data in (("notes.json", notes), ("tags.json", tags), ("reminders.json", reminders)):
+        with open(os.path.join(workdir, name), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+
+def measure(func, repeat, setup=None):
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        runs.append((time.perf_counter() - start) * 1000)
+    return runs
+
+
+def summarize(case, size, runs):
+    return {
+        "case": case,
+        "size": size,
+        "min_ms": round(min(runs), 3),
+        "median_ms": round(statistics.median(runs), 3),
+        "mean_ms": round(statistics.fmean(runs), 3),
+        "max_ms": round(max(runs), 3),
+        "runs_ms": [round(run, 3) for run in runs],
+    }
+
+
+def bench_backend(size, storage, repeat, lazy_content=False):
+    # ядро без Qt, тож вимірювання бекенду не потребує PyQt6 і дисплея
+    from notes_core import NotesStore
+    results = []
+    # перше відкриття імпортує JSON у вибране сховище, тому воно вимірюється окремо
+    start = time.perf_counter()
+    backend = NotesStore(storage=storage, lazy_content=lazy_content)
+    backend.flush()
+    results.append(summarize("backend.open", size, [(time.perf_counter() - start) * 1000]))
+    results.append(summarize("backend.load_notes", size, measure(backend.load_notes, repeat)))
+
+    def save():
+        backend.save_notes()
+        backend.flush()
+
+    results.append(summarize("backend.save_notes", size, measure(save, repeat)))
+    backend.close()
+    # повторне відкриття бере триграми зі збереженого індексу замість повного перебудування
+    start = time.perf_counter()
+    backend = NotesStore(storage=storage, lazy_content=lazy_content)
+    results.append(summarize("backend.open_warm", size, [(time.perf_counter() - start) * 1000]))
+    backend.close()
+    return results
+
+
+def bench_gui(app, size, repeat):
+    from PyQt6.QtCore import QEventLoop
+    from main import NotesApp
+    results = []
+    start = time.perf_counter()
+    window = NotesApp()
+    window.show()
+    app.processEvents()
+    results.append(summarize("notes_app.startup", size, [(time.perf_counter() - start) * 1000]))
+    page = window.main_page
+    start = time.perf_counter()
+    page.ensure_note_cards()
+    app.processEvents()
+    results.append(summarize("main_page.offscreen_cards", size, [(time.perf_counter() - start) * 1000]))
+    note_id = window.backend.note_id_at(0)
+
+    def timed(func):
+        def run():
+            func()
+            app.processEvents()
+        return run
+
+    def searched(func):
+        # пошук виконується у фоновому потоці, тому час рахується до показу результатів
+        def run():
+            func()
+            while page.searcher.is_pending():
+                app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+            app.processEvents()
+        return run
+
+    def arrange():
+        page.arrange_notes(range(window.backend.note_count()))
+        page.ensure_note_cards()
+
+    def toggle_theme():
+        window.is_dark_mode = not window.is_dark_mode
+        window.update_theme()
+
+    cases = [
+        ("main_page.filter_notes", searched(lambda: page.filter_notes(UK_WORDS[0])), None),
+        ("main_page.filter_notes_by_tag", searched(lambda: page.filter_notes_by_tag(TAG_NAMES[0])), None),
+        ("main_page.arrange_notes", timed(arrange), None),
+        ("main_page.expand_note_view", timed(lambda: page.expand_note_view(note_id)),
+         lambda: page.collapse_note(note_id)),
+        ("notes_app.update_theme", timed(toggle_theme), None),
+        ("reminder_manager.load_saved_reminders", timed(page.reminder_manager.load_saved_reminders), None),
+    ]
+    for case, func, setup in cases:
+        results.append(summarize(case, size, measure(func, repeat, setup)))
+    page.collapse_note(note_id)
+    window.backend.flush()
+    window.backend.close()
+    window.hide()
+    window.deleteLater()
+    app.processEvents()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Вимірювання швидкодії нотаток на синтетичних даних")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--storage", choices=STORAGE_ENGINES, default="sqlite")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-gui", action="store_true", help="лише вимірювання бекенду")
+    parser.add_argument("--virtual-grid", action="store_true", help="віртуальна сітка замість карток-віджетів")
+    parser.add_argument("--lazy-content", action="store_true", help="тримати в пам'яті лише заголовки й початок тексту")
+    parser.add_argument("--output", default="-", help="файл для JSON-звіту, '-' для stdout")
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ["NOTES_STORAGE"] = args.storage
+    if args.virtual_grid:
+        os.environ["NOTES_VIRTUAL_GRID"] = "1"
+    if args.lazy_content:
+        os.environ["NOTES_LAZY_CONTENT"] = "1"
+    output = args.output if args.output == "-" else os.path.abspath(args.output)
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="notes-bench-")
+    # notes_core визначає шляхи до файлів даних відносно поточного каталогу
+    os.chdir(workdir)
+    results = []
+    try:
+        app = None
+        if not args.no_gui:
+            from PyQt6.QtWidgets import QApplication
+            app = QApplication.instance() or QApplication(sys.argv[:1])
+        for size in args.sizes:
+            notes, tags, reminders = generate_notebook(size, args.seed)
+            write_notebook(workdir, notes, tags, reminders)
+            results.extend(bench_backend(size, args.storage, args.repeat, args.lazy_content))
+            if app is not None:
+                results.extend(bench_gui(app, size, args.repeat))
+            print(f"Розмір {size}: готово", file=sys.stderr)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "qt_platform": os.environ["QT_QPA_PLATFORM"],
+        "storage": args.storage,
+        "virtual_grid": args.virtual_grid,
+        "lazy_content": args.lazy_content,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output == "-":
+        print(text)
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
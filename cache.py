@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+
+
+class LruCache:
+    def __init__(self, max_cost, cost=len):
+        self.max_cost = max_cost
+        self.cost = cost
+        self.total_cost = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return default
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value):
+        cost = self.cost(value)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.total_cost -= old[1]
+            # елемент, більший за весь бюджет, не кешується, щоб не витіснити решту
+            if cost > self.max_cost:
+                return
+            self._items[key] = (value, cost)
+            self.total_cost += cost
+            while self.total_cost > self.max_cost:
+                _, (_, evicted_cost) = self._items.popitem(last=False)
+                self.total_cost -= evicted_cost
+
+    def discard(self, key):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.total_cost -= old[1]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.total_cost = 0
@@ -0,0 +1,94 @@
+from collections import Counter, defaultdict
+
+
+def max_distance(term):
+    # допустима кількість помилок залежить від довжини слова: у коротких словах опечатка змінює сенс
+    if len(term) <= 2:
+        return 0
+    if len(term) <= 5:
+        return 1
+    return 2
+
+
+def term_grams(term):
+    padded = "^^" + term + "$"
+    return {padded[start:start + 3] for start in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    # відстань Дамерау-Левенштейна (з перестановкою сусідніх літер), обчислення зупиняється, щойно вона перевищить limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, char_b in enumerate(b, 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if before_previous is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                value = min(value, before_previous[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return limit + 1
+        before_previous, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyVocabulary:
+    def __init__(self):
+        # триграми слів словника: кандидати на схожість шукаються за спільними триграмами, а не перебором
+        self.grams = defaultdict(set)
+        self.terms = set()
+        self.version = None
+
+    def sync(self, vocabulary, version):
+        if version == self.version:
+            return
+        current = vocabulary.keys()
+        for term in self.terms - current:
+            self._remove(term)
+        for term in current - self.terms:
+            self._add(term)
+        self.version = version
+
+    def _add(self, term):
+        self.terms.add(term)
+        for gram in term_grams(term):
+            self.grams[gram].add(term)
+
+    def _remove(self, term):
+        self.terms.discard(term)
+        for gram in term_grams(term):
+            terms = self.grams.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self.grams[gram]
+
+    def similar(self, term, limit=None):
+        limit = max_distance(term) if limit is None else limit
+        if limit == 0:
+            return {term: 0} if term in self.terms else {}
+        grams = term_grams(term)
+        # вставка, видалення чи заміна літери руйнує щонайбільше три триграми, перестановка сусідніх — чотири,
+        # тож схоже слово має решту триграм спільними
+        needed = max(len(grams) - 3 * limit - 1, 1)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self.grams.get(gram, ()))
+        candidates = {candidate for candidate, shared in counts.items() if shared >= needed}
+        # у коротких словах перестановка зачіпає майже всі триграми, тому вона перевіряється напряму
+        for position in range(len(term) - 1):
+            swapped = term[:position] + term[position + 1] + term[position] + term[position + 2:]
+            if swapped in self.terms:
+                candidates.add(swapped)
+        result = {}
+        for candidate in candidates:
+            if abs(len(candidate) - len(term)) <= limit:
+                distance = edit_distance(term, candidate, limit)
+                if distance <= limit:
+                    result[candidate] = distance
+        return result
@@ -0,0 +1,140 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from search_index import GRAM_SIZE, query_grams, containing_grams, iter_slots, bits_from_slots
+
+MAGIC = b"NTIX"
+FORMAT_VERSION = 3
+HEADER = struct.Struct("<4sIIIQI")
+DENSE, SPARSE = 0, 1
+
+
+def _slot_array(slots):
+    data = array("I", slots)
+    if sys.byteorder != "little":
+        data.byteswap()
+    return data
+
+
+class MappedGramIndex:
+    # збережений індекс відображається в пам'ять, і списки нотаток для грам читаються з файлу на вимогу
+    def __init__(self, path, file, mapped, meta, data_offset):
+        self.path = path
+        self._file = file
+        self._mapped = mapped
+        self._data = memoryview(mapped)[data_offset:]
+        self.keys = meta["keys"]
+        self.fingerprints = meta["fingerprints"]
+        self.grams = {gram: (kind, offset, length) for gram, kind, offset, length in meta["grams"]}
+        self.slots = {key: slot for slot, key in enumerate(self.keys) if key is not None}
+
+    @classmethod
+    def open(cls, path):
+        if not os.path.exists(path):
+            return None
+        file = open(path, "rb")
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            file.close()
+            print(f"Помилка читання пошукового індексу: {e}")
+            return None
+        try:
+            magic, version, gram_size, slot_count, meta_length, checksum = HEADER.unpack_from(mapped, 0)
+            if magic != MAGIC or version != FORMAT_VERSION or gram_size != GRAM_SIZE:
+                raise ValueError("невідомий формат файлу")
+            if zlib.crc32(memoryview(mapped)[HEADER.size:]) != checksum:
+                raise ValueError("контрольна сума не збігається")
+            meta = json.loads(mapped[HEADER.size:HEADER.size + meta_length].decode("utf-8"))
+            if len(meta["keys"]) != slot_count:
+                raise ValueError("пошкоджена таблиця нотаток")
+        except (struct.error, ValueError, KeyError) as e:
+            mapped.close()
+            file.close()
+            print(f"Пошуковий індекс буде перебудовано: {e}")
+            return None
+        return cls(path, file, mapped, meta, HEADER.size + meta_length)
+
+    @property
+    def slot_count(self):
+        return len(self.keys)
+
+    def slot_of(self, key, fingerprint):
+        slot = self.slots.get(key)
+        if slot is None or self.fingerprints[slot] != fingerprint:
+            return None
+        return slot
+
+    def bits(self, gram):
+        entry = self.grams.get(gram)
+        if entry is None:
+            return 0
+        kind, offset, length = entry
+        view = self._data[offset:offset + length]
+        if kind == DENSE:
+            return int.from_bytes(view, "little")
+        slots = array("I")
+        slots.frombytes(view)
+        if sys.byteorder != "little":
+            slots.byteswap()
+        return bits_from_slots(slots, self.slot_count)
+
+    def candidate_bits(self, query):
+        if len(query) < GRAM_SIZE:
+            bits = 0
+            for gram in containing_grams(query, self.grams):
+                bits |= self.bits(gram)
+            return bits
+        bits = None
+        for gram in query_grams(query):
+            gram_bits = self.bits(gram)
+            bits = gram_bits if bits is None else bits & gram_bits
+            if not bits:
+                return 0
+        return bits or 0
+
+    def keys_of(self, bits):
+        return {self.keys[slot] for slot in iter_slots(bits)}
+
+    def close(self):
+        self._data.release()
+        self._mapped.close()
+        self._file.close()
+
+
+def write_index_file(path, keys, fingerprints, postings):
+    # postings: пари (грама, біти слотів); для кожної грами записується менший із двох видів
+    slot_count = len(keys)
+    bitmap_length = (slot_count + 7) // 8
+    grams = []
+    chunks = []
+    offset = 0
+    for gram, bits in postings:
+        if not bits:
+            continue
+        count = bin(bits).count("1")
+        if count * 4 < bitmap_length:
+            chunk = _slot_array(iter_slots(bits)).tobytes()
+            kind = SPARSE
+        else:
+            chunk = bits.to_bytes(bitmap_length, "little")
+            kind = DENSE
+        grams.append([gram, kind, offset, len(chunk)])
+        chunks.append(chunk)
+        offset += len(chunk)
+    meta = json.dumps({"keys": keys, "fingerprints": fingerprints, "grams": grams},
+                      ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    checksum = zlib.crc32(meta)
+    for chunk in chunks:
+        checksum = zlib.crc32(chunk, checksum)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, GRAM_SIZE, slot_count, len(meta), checksum))
+        f.write(meta)
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
@@ -1,3 +1,6 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
 import sys
 import os
 import json
@@ -9,6 +12,26 @@ from Mainpage import MainPage
 from styles import Styles
 
 
+class StartupTimer:
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.last = STARTUP_STARTED
+        self.phases = {}
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self.last) * 1000, 3)
+        self.last = now
+
+    def report(self):
+        if not self.enabled:
+            return
+        total = round((time.perf_counter() - STARTUP_STARTED) * 1000, 3)
+        print(json.dumps({"phases_ms": self.phases, "total_ms": total}, ensure_ascii=False), file=sys.stderr)
+
+
 def resource_path(relative_path):
     if hasattr(sys, '_MEIPASS'):
         return os.path.join(sys._MEIPASS, relative_path)
@@ -18,28 +41,35 @@ def resource_path(relative_path):
 class NotesApp(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.startup_timer = StartupTimer(os.environ.get("NOTES_STARTUP_TIMING") == "1")
+        self.startup_timer.mark("imports")
+        self.startup_finished = False
         self.setWindowTitle("Нотатки")
-        self.setWindowIcon(QIcon(resource_path("icon.png")))
         self.resize(1200, 800)
 
         screen = QApplication.primaryScreen().geometry()
         self.setMinimumSize(int(screen.width() * 0.3), int(screen.height() * 0.3))
 
-        self.backend = NotesBackend()
-        self.main_page = MainPage(self.backend)
+        self.backend = NotesBackend(storage=os.environ.get("NOTES_STORAGE", "sqlite"),
+                                    lazy_content=os.environ.get("NOTES_LAZY_CONTENT") == "1")
+        self.startup_timer.mark("backend")
+        self.main_page = MainPage(self.backend, virtual_grid=os.environ.get("NOTES_VIRTUAL_GRID") == "1")
         self.setCentralWidget(self.main_page)
+        self.startup_timer.mark("first_screen_cards")
 
         self.reminders_widget = None
         self.is_dark_mode = False
 
         self.setup_top_bar()
-        self.setup_system_tray()
         self.setup_expand_button()
         self.update_theme()
+        self.startup_timer.mark("top_bar")
 
         self.current_tag = None
         self.search_text = ""
         self.is_topbar_expanded = True
+        # дані записуються у фоновому потоці, тож їх треба дописати за будь-якого виходу, а не лише з меню трею
+        QApplication.instance().aboutToQuit.connect(self.save_before_quit)
 
     def setup_top_bar(self):
         top_bar = QWidget()
@@ -62,6 +92,7 @@ class NotesApp(QMainWindow):
 
         self.search_field = QLineEdit()
         self.search_field.setPlaceholderText("Пошук нотаток...")
+        self.search_field.setToolTip('Наприклад: title:диплом tag:важливе -tag:ідея "точна фраза" created:>2025-06-01')
         self.search_field.textChanged.connect(self.update_search_text)
         self.search_field.setFixedHeight(36)
         self.search_field.setStyleSheet(Styles.get_search_field_style(self.is_dark_mode))
@@ -70,6 +101,22 @@ class NotesApp(QMainWindow):
         self.search_field.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Fixed)
         left_layout.addWidget(self.search_field)
 
+        self.ranked_button = QPushButton("За релевантністю")
+        self.ranked_button.setCheckable(True)
+        self.ranked_button.setToolTip("Показувати найрелевантніші нотатки першими")
+        self.ranked_button.setStyleSheet(Styles.get_tag_button_style(self.is_dark_mode))
+        self.ranked_button.toggled.connect(self.toggle_ranked_search)
+        self.ranked_button.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
+        left_layout.addWidget(self.ranked_button)
+
+        self.fuzzy_button = QPushButton("Нечіткий пошук")
+        self.fuzzy_button.setCheckable(True)
+        self.fuzzy_button.setToolTip("Знаходити нотатки, навіть якщо в запиті є одна-дві помилки")
+        self.fuzzy_button.setStyleSheet(Styles.get_tag_button_style(self.is_dark_mode))
+        self.fuzzy_button.toggled.connect(self.toggle_fuzzy_search)
+        self.fuzzy_button.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
+        left_layout.addWidget(self.fuzzy_button)
+
         self.tag_menu_button = QPushButton("Теги")
         self.tag_menu_button.setStyleSheet(Styles.get_tag_dropdown_button_style(self.is_dark_mode))
         self.tag_menu_button.clicked.connect(self.show_tag_menu)
@@ -81,7 +128,7 @@ class NotesApp(QMainWindow):
         tags_layout.setContentsMargins(0, 0, 0, 0)
         tags_layout.setSpacing(5)
 
-        self.tag_selector = TagSelector()
+        self.tag_selector = TagSelector(self.backend)
         self.tag_selector.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
         self.tag_selector.tag_selected.connect(self.search_by_tag)
         tags_layout.addWidget(self.tag_selector)
@@ -101,6 +148,12 @@ class NotesApp(QMainWindow):
         right_layout.setContentsMargins(0, 0, 0, 0)
         right_layout.setSpacing(10)
 
+        self.transfer_button = QPushButton("Імпорт / експорт")
+        self.transfer_button.setStyleSheet(Styles.get_tag_button_style(self.is_dark_mode))
+        self.transfer_button.clicked.connect(self.show_transfer_menu)
+        self.transfer_button.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
+        right_layout.addWidget(self.transfer_button)
+
         self.reminders_button = QPushButton("Мої нагадування")
         self.reminders_button.setStyleSheet(Styles.get_tag_button_style(self.is_dark_mode))
         self.reminders_button.clicked.connect(self.toggle_reminders_widget)
@@ -129,6 +182,31 @@ class NotesApp(QMainWindow):
         self.initial_button_width = 150
         self.initial_icon_size = 32
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        QTimer.singleShot(200, self.main_page._update_button_position)
+        if not self.startup_finished:
+            self.startup_finished = True
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        # усе, без чого можна показати перший екран, виконується вже після появи вікна
+        self.startup_timer.mark("window_shown")
+        self.setWindowIcon(QIcon(resource_path("icon.png")))
+        self.setup_system_tray()
+        self.startup_timer.mark("tray")
+        self.main_page.reminder_manager.load_saved_reminders()
+        self.startup_timer.mark("reminders")
+        if self.main_page.pending_card_count():
+            self.main_page.cards_built.connect(self.finish_card_build)
+        else:
+            self.startup_timer.report()
+
+    def finish_card_build(self):
+        self.main_page.cards_built.disconnect(self.finish_card_build)
+        self.startup_timer.mark("offscreen_cards")
+        self.startup_timer.report()
+
     def setup_system_tray(self):
         self.tray_icon = QSystemTrayIcon(self)
         self.tray_icon.setIcon(QIcon(resource_path("Add.png")))
@@ -178,19 +256,32 @@ class NotesApp(QMainWindow):
             self.show_from_tray()
 
     def quit_application(self):
-        self.backend.save_notes()
         QApplication.quit()
 
+    def save_before_quit(self):
+        self.main_page.searcher.close()
+        self.main_page.reminder_manager.flush()
+        self.backend.flush()
+        self.backend.close()
+
     def update_search_text(self, text):
         self.search_text = text
-        self.apply_filters()
+        self.apply_filters(immediate=False)
 
     def search_notes(self):
         self.apply_filters()
 
-    def apply_filters(self):
-        self.main_page.filter_notes(self.search_text, self.current_tag)
+    def apply_filters(self, immediate=True):
+        self.main_page.filter_notes(self.search_text, self.current_tag, immediate=immediate)
+
 
+    def toggle_ranked_search(self, checked):
+        self.main_page.set_ranked_search(checked)
+        self.apply_filters()
+
+    def toggle_fuzzy_search(self, checked):
+        self.main_page.set_fuzzy_search(checked)
+        self.apply_filters()
 
     def search_by_tag(self, tag_name):
         self.current_tag = tag_name
@@ -204,6 +295,31 @@ class NotesApp(QMainWindow):
         self.reset_tag_button.setEnabled(False)
         self.tag_selector.reset_tag_button_text()
 
+    def show_transfer_menu(self):
+        menu = QMenu(self)
+        import_action = menu.addAction("Імпортувати з файлу...")
+        import_action.triggered.connect(lambda: self.import_notes(directory=False))
+        import_dir_action = menu.addAction("Імпортувати з теки Markdown...")
+        import_dir_action.triggered.connect(lambda: self.import_notes(directory=True))
+        menu.addSeparator()
+        export_action = menu.addAction("Експортувати всі нотатки...")
+        export_action.triggered.connect(lambda: self.backend.export_notes(self))
+        export_found_action = menu.addAction("Експортувати знайдені нотатки...")
+        export_found_action.triggered.connect(self.export_found_notes)
+        export_found_action.setEnabled(bool(self.search_text or self.current_tag))
+        menu.exec(self.transfer_button.mapToGlobal(self.transfer_button.rect().bottomLeft()))
+
+    def import_notes(self, directory=False):
+        if self.backend.import_notes(self, directory=directory):
+            self.main_page.sync_note_cards()
+            self.apply_filters()
+
+    def export_found_notes(self):
+        # експортуються ті самі нотатки, що показано в поточному режимі пошуку
+        searcher = self.main_page.searcher
+        note_ids = self.backend.found_note_ids(self.search_text, self.current_tag, searcher.ranked, searcher.fuzzy)
+        self.backend.export_notes(self, note_ids)
+
     def toggle_reminders_widget(self):
         if self.reminders_widget is None or not self.reminders_widget.isVisible():
             if self.reminders_widget is None:
@@ -241,10 +357,12 @@ class NotesApp(QMainWindow):
                 top_layout = QHBoxLayout(top_row)
                 top_layout.setContentsMargins(0, 0, 0, 0)
                 top_layout.setSpacing(5)
-                for w in [self.search_field, self.tag_selector, self.reset_tag_button, self.reminders_button, self.dark_mode_switch, self.tag_menu_button]:
+                for w in [self.search_field, self.ranked_button, self.fuzzy_button, self.tag_selector, self.reset_tag_button, self.transfer_button, self.reminders_button, self.dark_mode_switch, self.tag_menu_button]:
                     if w.parent():
                         w.setParent(None)
                 top_layout.addWidget(self.search_field)
+                top_layout.addWidget(self.ranked_button)
+                top_layout.addWidget(self.fuzzy_button)
                 top_layout.addStretch(1)
                 top_layout.addWidget(self.tag_selector)
                 top_layout.addWidget(self.reset_tag_button)
@@ -253,6 +371,7 @@ class NotesApp(QMainWindow):
                 bottom_layout = QHBoxLayout(bottom_row)
                 bottom_layout.setContentsMargins(0, 0, 0, 0)
                 bottom_layout.setSpacing(5)
+                bottom_layout.addWidget(self.transfer_button)
                 bottom_layout.addWidget(self.reminders_button)
                 bottom_layout.addWidget(self.dark_mode_switch)
                 bottom_layout.addStretch(1)
@@ -275,6 +394,8 @@ class NotesApp(QMainWindow):
                                     if item.widget():
                                         item.widget().setParent(None)
                                 layout.addWidget(self.search_field)
+                                layout.addWidget(self.ranked_button)
+                                layout.addWidget(self.fuzzy_button)
                                 layout.addStretch(1)
                                 layout.addWidget(self.tag_selector)
                                 layout.addWidget(self.reset_tag_button)
@@ -283,6 +404,7 @@ class NotesApp(QMainWindow):
                                     item = layout.takeAt(0)
                                     if item.widget():
                                         item.widget().setParent(None)
+                                layout.addWidget(self.transfer_button)
                                 layout.addWidget(self.reminders_button)
                                 layout.addWidget(self.dark_mode_switch)
                                 layout.addStretch(1)
@@ -295,7 +417,7 @@ class NotesApp(QMainWindow):
         else:
             small_screen_container = self.findChild(QWidget, "small_screen_container")
             if small_screen_container:
-                for w in [self.search_field, self.tag_menu_button, self.tag_selector, self.reset_tag_button, self.reminders_button, self.dark_mode_switch]:
+                for w in [self.search_field, self.ranked_button, self.fuzzy_button, self.tag_menu_button, self.tag_selector, self.reset_tag_button, self.transfer_button, self.reminders_button, self.dark_mode_switch]:
                     if w.parent():
                         w.setParent(None)
                 small_screen_container.deleteLater()
@@ -310,6 +432,8 @@ class NotesApp(QMainWindow):
                 tags_layout.setContentsMargins(0, 0, 0, 0)
                 tags_layout.setSpacing(5)
                 left_layout.addWidget(self.search_field)
+                left_layout.addWidget(self.ranked_button)
+                left_layout.addWidget(self.fuzzy_button)
                 left_layout.addWidget(self.tag_menu_button)
                 tags_layout.addWidget(self.tag_selector)
                 tags_layout.addWidget(self.reset_tag_button)
@@ -319,6 +443,7 @@ class NotesApp(QMainWindow):
                 right_layout = QHBoxLayout(right_container)
                 right_layout.setContentsMargins(0, 0, 0, 0)
                 right_layout.setSpacing(10)
+                right_layout.addWidget(self.transfer_button)
                 right_layout.addWidget(self.reminders_button)
                 right_layout.addWidget(self.dark_mode_switch)
                 while self.single_row_container.layout().count():
@@ -343,10 +468,6 @@ class NotesApp(QMainWindow):
             self.expand_button.hide()
             self.menuWidget().show()
         
-    def showEvent(self, event):
-        super().showEvent(event)
-        QTimer.singleShot(200, self.main_page._update_button_position)
-        
     def toggle_theme(self):
         self.is_dark_mode = self.dark_mode_switch.isChecked()
         self.update_theme()
@@ -370,7 +491,16 @@ class NotesApp(QMainWindow):
         
         if hasattr(self, 'reminders_button'):
             self.reminders_button.setStyleSheet(Styles.get_tag_button_style(self.is_dark_mode))
-        
+
+        if hasattr(self, 'transfer_button'):
+            self.transfer_button.setStyleSheet(Styles.get_tag_button_style(self.is_dark_mode))
+
+        if hasattr(self, 'ranked_button'):
+            self.ranked_button.setStyleSheet(Styles.get_tag_button_style(self.is_dark_mode))
+
+        if hasattr(self, 'fuzzy_button'):
+            self.fuzzy_button.setStyleSheet(Styles.get_tag_button_style(self.is_dark_mode))
+
         if hasattr(self, 'menuWidget'):
             self.menuWidget().setStyleSheet(Styles.get_top_bar_style(self.is_dark_mode))
         
@@ -452,10 +582,7 @@ class NotesApp(QMainWindow):
         dialog.update_theme(self.is_dark_mode)
         if dialog.exec():
             tags_to_delete = dialog.get_selected_tags()
-            for tag in tags_to_delete:
-                if tag in self.backend.tags:
-                    del self.backend.tags[tag]
-            self.backend.save_tags()
+            self.backend.delete_tags(tags_to_delete)
             self.tag_selector.available_tags = self.tag_selector.load_tags()
             self.tag_selector.populate_menu()
 
@@ -482,8 +609,9 @@ class NotesApp(QMainWindow):
 class TagSelector(QWidget):
     tag_selected = pyqtSignal(str)
 
-    def __init__(self):
+    def __init__(self, backend):
         super().__init__()
+        self.backend = backend
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(0, 0, 0, 0)
         self.tag_button = QPushButton("Вибрати тег")
@@ -507,6 +635,7 @@ class TagSelector(QWidget):
         main_menu_layout.setContentsMargins(0, 0, 0, 0)
         main_menu_layout.addWidget(self.inner_container)
 
+        self.query_terms = []
         self.tag_button.clicked.connect(self.show_tag_menu)
         self.available_tags = self.load_tags()
         self.populate_menu()
@@ -535,16 +664,7 @@ class TagSelector(QWidget):
             self.tag_menu.hide()
 
     def load_tags(self):
-        tags_path = resource_path("tags.json")
-        if os.path.exists(tags_path):
-            with open(tags_path, "r", encoding="utf-8") as f:
-                try:
-                    tags_data = json.load(f)
-                    if isinstance(tags_data, list):
-                        return tags_data
-                except json.JSONDecodeError:
-                    print("Помилка при зчитуванні tags.json.")
-        return []
+        return [{"name": name, "color": color} for name, color in self.backend.get_tags().items()]
 
     def populate_menu(self):
         for i in reversed(range(self.menu_layout.count())):
@@ -564,10 +684,22 @@ class TagSelector(QWidget):
         self.tag_menu.adjustSize()
 
     def select_tag(self, tag_name):
-        self.tag_button.setText(tag_name)
-        self.tag_selected.emit(tag_name)
+        # Ctrl додає тег до умови "усі", Shift — до умови "будь-який", Alt — виключає тег
+        modifiers = QApplication.keyboardModifiers()
+        if modifiers & Qt.KeyboardModifier.ControlModifier and self.query_terms:
+            self.query_terms.append(tag_name)
+        elif modifiers & Qt.KeyboardModifier.ShiftModifier and self.query_terms:
+            self.query_terms[-1] = f"{self.query_terms[-1]}|{tag_name}"
+        elif modifiers & Qt.KeyboardModifier.AltModifier:
+            self.query_terms.append(f"-{tag_name}")
+        else:
+            self.query_terms = [tag_name]
+        query = " ".join(self.query_terms)
+        self.tag_button.setText(query)
+        self.tag_selected.emit(query)
 
     def reset_tag_button_text(self):
+        self.query_terms = []
         self.tag_button.setText("Вибрати тег")
 
 
@@ -619,43 +751,35 @@ class RemindersWidget(QWidget):
             if item.widget():
                 item.widget().deleteLater()
             
-        try:
-            with open(resource_path("reminders.json"), "r", encoding="utf-8") as f:
-                reminders = json.load(f)
-                
-            if not reminders:
-                no_reminders = QLabel("Немає активних нагадувань")
-                no_reminders.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.content_layout.addWidget(no_reminders)
-            else:
-                for reminder in reminders:
-                    reminder_text = reminder["text"]
-                    reminder_datetime = reminder["datetime"].replace("T", " ")
-
-                    reminder_frame = QFrame()
-                    reminder_frame.setObjectName("reminderItemFrame")
-                    reminder_frame.setFrameShape(QFrame.Shape.StyledPanel)
-                    reminder_frame.setFrameShadow(QFrame.Shadow.Raised)
-                    reminder_frame.setStyleSheet(
-                        Styles.get_reminder_item_frame_style(
-                            self.parent().is_dark_mode if self.parent() and hasattr(self.parent(), "is_dark_mode") else False
-                        )
-                    )
-                    frame_layout = QVBoxLayout(reminder_frame)
-                    frame_layout.setContentsMargins(8, 8, 8, 8)
-                    frame_layout.setSpacing(2)
-
-                    item = QLabel(f"Текст: {reminder_text[:50]}...\nДата та час: {reminder_datetime}")
-                    item.setObjectName("reminderItem")
-                    item.setWordWrap(True)
-                    frame_layout.addWidget(item)
-
-                    self.content_layout.addWidget(reminder_frame)
-                
-        except (FileNotFoundError, json.JSONDecodeError):
+        reminders = self.parent().main_page.reminder_manager.get_reminders()
+        if not reminders:
             no_reminders = QLabel("Немає активних нагадувань")
             no_reminders.setAlignment(Qt.AlignmentFlag.AlignCenter)
             self.content_layout.addWidget(no_reminders)
+        else:
+            for reminder in reminders:
+                reminder_text = reminder["text"]
+                reminder_datetime = reminder["datetime"].replace("T", " ")
+
+                reminder_frame = QFrame()
+                reminder_frame.setObjectName("reminderItemFrame")
+                reminder_frame.setFrameShape(QFrame.Shape.StyledPanel)
+                reminder_frame.setFrameShadow(QFrame.Shadow.Raised)
+                reminder_frame.setStyleSheet(
+                    Styles.get_reminder_item_frame_style(
+                        self.parent().is_dark_mode if self.parent() and hasattr(self.parent(), "is_dark_mode") else False
+                    )
+                )
+                frame_layout = QVBoxLayout(reminder_frame)
+                frame_layout.setContentsMargins(8, 8, 8, 8)
+                frame_layout.setSpacing(2)
+
+                item = QLabel(f"Текст: {reminder_text[:50]}...\nДата та час: {reminder_datetime}")
+                item.setObjectName("reminderItem")
+                item.setWordWrap(True)
+                frame_layout.addWidget(item)
+
+                self.content_layout.addWidget(reminder_frame)
             
         self.content_layout.addStretch()
 
@@ -738,7 +862,7 @@ class CustomTagMenu(QWidget):
         tag_layout.setSpacing(0)
         
         label = QLabel(f"#{tag_name}")
-        label.setStyleSheet(Styles.TAG_LABEL_STYLE.format(color=color))
+        label.setStyleSheet(Styles.get_tag_label_style(color))
         tag_layout.addWidget(label)
         
         self.container_layout.addWidget(tag_widget)
@@ -0,0 +1,106 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# усі варіанти апострофа зводяться до одного, а ґ до г, бо в запитах їх часто пишуть по-різному
+# (str.translate зі словником для кирилиці в кілька разів повільніший за кілька replace)
+CHAR_MAP = (("’", "'"), ("ʼ", "'"), ("‘", "'"), ("`", "'"), ("ʹ", "'"), ("′", "'"), ("ґ", "г"))
+TOKEN_RE = re.compile(r"\w+(?:'\w+)*")
+# у вихідному тексті апострофи ще не зведені до одного, тож токен може містити будь-який із них
+SPAN_RE = re.compile(r"\w+(?:['%s]\w+)*" % "".join(char for char, replacement in CHAR_MAP if replacement == "'"))
+MIN_STEM = 3
+REFLEXIVE = ("ться", "ся", "сь")
+VOWELS = frozenset("аеєиіїоуюя")
+VERB_ENDINGS = frozenset({
+    "ати", "яти", "ити", "іти", "їти", "ють", "ать", "ять", "уть", "ить", "іть", "ала", "ало", "али", "ила", "ило", "или",
+    "ає", "яє", "ує", "ює", "ав", "ив",
+})
+# закінчення відмінків і форм дієслів, від найдовших до найкоротших
+ENDINGS = tuple(sorted(VERB_ENDINGS | {
+    "ами", "ями", "ові", "еві", "єві", "ах", "ях", "ам", "ям", "ом", "ем", "єм", "ів", "їв", "ей",
+    "ого", "ому", "ими", "іми", "ий", "ій", "ої", "ою", "ею", "єю", "их", "іх", "им", "ім", "ая", "яя", "еє", "ее",
+    "а", "я", "о", "е", "є", "у", "ю", "і", "ї", "и", "ь", "й",
+}, key=len, reverse=True))
+# іменники на -ть, у яких дієслівне закінчення відрізало б частину основи (пам'ять, але пам'яті)
+SOFT_NOUNS = frozenset({"память", "благодать", "печать", "блакить", "каламуть", "повіть", "незабудь"})
+# іменники на -ень без випадного голосного (олень — оленя, а не день — дня)
+STEADY_EN = frozenset({"олень", "тюлень", "пельмень", "зелень", "мішень", "сажень", "женьшень", "ячмень"})
+# форми одного слова, що мусять мати однакову основу (перевіряються запуском модуля)
+STEM_PAIRS = (
+    ("пам’ять", "пам'яті"), ("пам'ять", "пам'яттю"), ("день", "дня"), ("день", "днів"), ("день", "днем"),
+    ("тиждень", "тижня"), ("учень", "учнями"), ("олень", "оленя"), ("олівець", "олівця"), ("нотаток", "нотатка"),
+    ("завдання", "завдань"), ("робити", "робить"), ("робити", "робила"),
+)
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFKC", text).casefold()
+    for char, replacement in CHAR_MAP:
+        if char in text:
+            text = text.replace(char, replacement)
+    return text
+
+
+@lru_cache(maxsize=200000)
+def stem(word):
+    # легкий стемер: відкидає закінчення, але лишає основу щонайменше з MIN_STEM літер
+    word = word.replace("'", "")
+    for ending in REFLEXIVE:
+        if word.endswith(ending) and len(word) - len(ending) > MIN_STEM:
+            word = word[:-len(ending)]
+            break
+    # випадний голосний: олівець -> олівц, як в олівця, день -> дн, як у дня, та нотаток -> нотатк, як у нотатка
+    if len(word) >= MIN_STEM + 2 and word.endswith("ець"):
+        word = word[:-3] + "ц"
+    elif len(word) >= 4 and word.endswith("ень") and word[-4] not in VOWELS and word not in STEADY_EN:
+        # тиждень втрачає ще й д: тижня
+        word = word[:-5] + "жн" if word.endswith("ждень") else word[:-3] + "н"
+    else:
+        soft_noun = word in SOFT_NOUNS
+        for ending in ENDINGS:
+            if not word.endswith(ending) or soft_noun and ending in VERB_ENDINGS:
+                continue
+            rest = len(word) - len(ending)
+            # коротка основа з випадним голосним: дня, днів -> дн
+            if rest >= MIN_STEM or rest == 2 and word[1] == "н" and word[0] not in VOWELS:
+                word = word[:-len(ending)]
+                break
+        else:
+            if len(word) >= MIN_STEM + 2 and word.endswith(("ок", "ек")):
+                word = word[:-2] + "к"
+    # завдання / завдань дають однакову основу
+    if len(word) > MIN_STEM and word[-1] == word[-2]:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize_text(text))
+
+
+def stems(normalized_text):
+    return [stem(token) for token in TOKEN_RE.findall(normalized_text)]
+
+
+def analyze(text):
+    return stems(normalize_text(text))
+
+
+def token_spans(text):
+    # (початок, кінець, нормалізований токен) у вихідному тексті; однакові слова нормалізуються один раз
+    normalized = {}
+    spans = []
+    for match in SPAN_RE.finditer(text):
+        token = match.group()
+        norm = normalized.get(token)
+        if norm is None:
+            norm = normalized[token] = normalize_text(token)
+        spans.append((match.start(), match.end(), norm))
+    return spans
+
+
+if __name__ == "__main__":
+    for first, second in STEM_PAIRS:
+        first_stem, second_stem = analyze(first)[0], analyze(second)[0]
+        assert first_stem == second_stem, f"{first} -> {first_stem}, {second} -> {second_stem}"
+    print(f"Основи збігаються для {len(STEM_PAIRS)} пар словоформ")
@@ -0,0 +1,571 @@
+from storage import open_storage, atomic_write
+from search_index import SearchIndex, match_notes, RANK_LIMIT
+from index_file import MappedGramIndex, write_index_file
+from scheduler import ReminderScheduler
+from persistence import WriteBehindWriter
+from cache import LruCache
+from snippets import SnippetBuilder
+from functools import partial
+from collections.abc import Sequence
+from types import MappingProxyType
+from datetime import datetime
+import itertools
+import tempfile
+import uuid
+import json
+import time
+import zlib
+import sys
+import os
+
+def resource_path(relative_path):
+    if hasattr(sys, '_MEIPASS'):
+        return os.path.join(sys._MEIPASS, relative_path)
+    return os.path.join(os.path.abspath("."), relative_path)
+
+PREVIEW_LENGTH = 61
+CREATED_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+def new_note_id():
+    return uuid.uuid4().hex
+
+class NoteSequence(Sequence):
+    # подання списку нотаток без копіювання: елементи читаються на вимогу і видно всі подальші зміни
+    def __init__(self, notes, item):
+        self._notes = notes
+        self._item = item
+
+    def __len__(self):
+        return len(self._notes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._item(note) for note in self._notes[index]]
+        return self._item(self._notes[index])
+
+    def __iter__(self):
+        for note in self._notes:
+            yield self._item(note)
+
+class NoteSpool:
+    # записи для одного масового запису складаються в тимчасовий файл, а не в список у пам'яті,
+    # і сховище читає їх звідти потоком в одній транзакції
+    def __init__(self):
+        self._file = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self._count = 0
+
+    def append(self, note):
+        self._file.write(json.dumps(note, ensure_ascii=False) + "\n")
+        self._count += 1
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+
+    def close(self):
+        self._file.close()
+
+class NotesStore:
+    def __init__(self, filename="notes.json", tags_file="tags.json", storage="sqlite", db_file="notes.db",
+                 write_delay=0.3, lazy_content=False, body_cache_chars=4_000_000, index_file="notes.index"):
+        self.filename = resource_path(filename)
+        self.tags_file = resource_path(tags_file)
+        self.index_file = resource_path(index_file) if index_file else None
+        self.storage = open_storage(storage, self.filename, self.tags_file, resource_path(db_file))
+        self.writer = WriteBehindWriter(debounce=write_delay)
+        # у лінивому режимі в пам'яті лишаються заголовки, теги й початок тексту, а повний вміст
+        # нотаток читається зі сховища на вимогу і тримається в обмеженому LRU-кеші
+        self.lazy_content = lazy_content and hasattr(self.storage, "load_note_headers")
+        if lazy_content and not self.lazy_content:
+            print("Ліниве завантаження вмісту доступне лише для SQLite, нотатки завантажено повністю")
+        self.bodies = LruCache(body_cache_chars)
+        # вміст нотаток, які імпорт уже проіндексував, але ще не додав до списку; у сховищі їх поки немає
+        self._staged_bodies = {}
+        # фрагменти з підсвіченими збігами кешуються для пари (ревізія нотатки, запит)
+        self.snippets = SnippetBuilder()
+        self._revisions = {}
+        self.notes = self.load_notes()
+        self.tags = self.load_tags()
+        self._positions = {}
+        self.version = 0
+        self._snapshot = None
+        self.contents = NoteSequence(self.notes, self._content_of)
+        self.search_index = SearchIndex(load_text=self._load_body if self.lazy_content else None)
+        self._assign_missing_ids()
+        self._reindex_positions(0)
+        self.rebuild_search_index()
+
+    def load_notes(self):
+        if self.lazy_content:
+            return self.storage.load_note_headers(PREVIEW_LENGTH)
+        return self.storage.load_notes()
+
+    def save_notes(self):
+        notes = [self._stored_note(note, self._content_of(note)) for note in self.notes]
+        self.writer.submit(partial(self.storage.save_notes, notes), group="notes", replaces_group=True)
+
+    def _assign_missing_ids(self):
+        missing = False
+        for note in self.notes:
+            if not note.get("id"):
+                note["id"] = new_note_id()
+                missing = True
+        if missing:
+            self.save_notes()
+
+    def _reindex_positions(self, start, stop=None):
+        stop = len(self.notes) if stop is None else stop
+        for index in range(start, stop):
+            self._positions[self.notes[index]["id"]] = index
+
+    def _persist_note_change(self, method_name, *args, key=None):
+        if not self.storage.row_updates:
+            self.save_notes()
+            return
+        self.writer.submit(partial(getattr(self.storage, method_name), *args), group="notes", key=key)
+
+    def flush(self, timeout=None):
+        return self.writer.flush(timeout)
+
+    def rebuild_search_index(self):
+        self.search_index.clear()
+        if self.index_file:
+            # нотатки, текст яких не змінився з минулого запуску, не розбиваються на триграми повторно
+            self.search_index.attach_base(MappedGramIndex.open(self.index_file))
+        if not self.lazy_content:
+            for note in self.notes:
+                self._index_note(note)
+            return
+        for note_id, content in self.storage.iter_note_contents():
+            note = self.get_note(note_id)
+            if note is not None:
+                self._index_note(note, content)
+
+    def _index_note(self, note, content=None):
+        if content is None:
+            content = note.get("content", "")
+        self.search_index.update(note["id"], note.get("title", ""), content, note.get("tags", ""),
+                                 note.get("created", ""))
+
+    def _set_content(self, note, content):
+        if self.lazy_content:
+            note["preview"] = content[:PREVIEW_LENGTH]
+            self.bodies.put(note["id"], content)
+        else:
+            note["content"] = content
+
+    def _stored_note(self, note, content):
+        return {"id": note["id"], "title": note["title"], "content": content, "tags": note["tags"],
+                "created": note.get("created", "")}
+
+    def _load_body(self, note_id):
+        content = self.bodies.get(note_id)
+        if content is None:
+            content = self._staged_bodies.get(note_id)
+            if content is not None:
+                return content
+            # незаписані зміни мають потрапити до сховища, перш ніж читати з нього
+            if self.writer.pending():
+                self.writer.flush()
+            content = self.storage.load_note_content(note_id) or ""
+            self.bodies.put(note_id, content)
+        return content
+
+    def search(self, search_text, search_tag=None):
+        return match_notes(self.search_snapshot()[1], self.search_index.search(search_text, search_tag))
+
+    def search_ranked(self, search_text, search_tag=None, limit=RANK_LIMIT):
+        ranked, hits = self.search_index.rank(search_text, search_tag, limit)
+        return match_notes(self.search_snapshot()[1], hits), ranked
+
+    def found_note_ids(self, search_text, search_tag=None, ranked=False, fuzzy=False):
+        hits = self.search_index.find(search_text, search_tag, ranked, fuzzy)[1]
+        return [note_id for note_id, match in zip(self.note_ids(), match_notes(self.note_ids(), hits)) if match]
+
+    def search_snapshot(self):
+        # незмінний знімок порядку нотаток для фонового пошуку, перебудовується лише після змін
+        if self._snapshot is None or self._snapshot[0] != self.version:
+            self._snapshot = (self.version, tuple(note["id"] for note in self.notes))
+        return self._snapshot
+
+    def note_ids(self):
+        return self.search_snapshot()[1]
+
+    def note_count(self):
+        return len(self.notes)
+
+    def index_of(self, note_id):
+        return self._positions.get(note_id, -1)
+
+    def note_id_at(self, index):
+        return self.notes[index]["id"] if 0 <= index < len(self.notes) else None
+
+    def note_at(self, index):
+        return MappingProxyType(self.notes[index]) if 0 <= index < len(self.notes) else None
+
+    def get_note(self, note_id):
+        index = self._positions.get(note_id)
+        return self.notes[index] if index is not None else None
+
+    def get_notes(self):
+        return self.contents
+
+    def get_note_title(self, note_id):
+        note = self.get_note(note_id)
+        return note["title"] if note else ""
+
+    def get_note_tags(self, note_id):
+        note = self.get_note(note_id)
+        return note["tags"] if note else ""
+
+    def get_note_content(self, note_id):
+        note = self.get_note(note_id)
+        return self._content_of(note) if note is not None else ""
+
+    def get_note_record(self, note_id):
+        note = self.get_note(note_id)
+        return self._stored_note(note, self._content_of(note)) if note is not None else None
+
+    def _content_of(self, note):
+        return note["content"] if "content" in note else self._load_body(note["id"])
+
+    def get_note_preview(self, note_id):
+        note = self.get_note(note_id)
+        if note is None:
+            return ""
+        return note["content"][:PREVIEW_LENGTH] if "content" in note else note["preview"]
+
+    def get_note_snippet(self, note_id, search_text):
+        note = self.get_note(note_id)
+        if note is None or not search_text.strip():
+            return None
+        return self.snippets.snippet(note_id, self._revisions.get(note_id, 0), search_text,
+                                     lambda: self._content_of(note))
+
+    def add_note(self):
+        content = "Нова нотатка"
+        note = {
+            "id": new_note_id(),
+            "title": "",
+            "tags": "",
+            "created": datetime.now().strftime(CREATED_FORMAT)
+        }
+        self._set_content(note, content)
+        self.notes.append(note)
+        self.version += 1
+        self._positions[note["id"]] = len(self.notes) - 1
+        self._index_note(note, content)
+        self._persist_note_change("insert_note", len(self.notes) - 1, self._stored_note(note, content))
+        return note["id"]
+
+    def add_notes(self, notes):
+        return self.publish_notes(self.stage_notes(notes))
+
+    def stage_notes(self, notes):
+        # перша половина масового додавання, що може працювати у фоновому потоці: нотатки надходять потоком,
+        # кожна індексується одразу, а записи для сховища складаються в буфер; список нотаток і version
+        # не змінюються, тож GUI і пошук тим часом бачать лише вже опубліковані нотатки.
+        # Якщо потік обірветься помилкою, підготовлене прибирається з індексу
+        staged = []
+        seen = set()
+        spool = NoteSpool()
+        try:
+            for source in notes:
+                # id з JSONL може бути числом, а решта коду й сигнали Qt очікують рядок
+                note_id = str(source["id"]) if source.get("id") is not None else ""
+                if not note_id or note_id in self._positions or note_id in seen:
+                    note_id = new_note_id()
+                seen.add(note_id)
+                content = str(source.get("content") or "")
+                # дата створення лишається з джерела, а якщо її там немає, вона невідома
+                note = {"id": note_id, "title": str(source.get("title") or ""), "tags": str(source.get("tags") or ""),
+                        "created": str(source.get("created") or "")}
+                if self.lazy_content:
+                    note["preview"] = content[:PREVIEW_LENGTH]
+                    self._staged_bodies[note_id] = content
+                else:
+                    note["content"] = content
+                staged.append(note)
+                self._index_note(note, content)
+                spool.append(self._stored_note(note, content))
+        except BaseException:
+            spool.close()
+            for note in staged:
+                self.search_index.remove(note["id"])
+                self._staged_bodies.pop(note["id"], None)
+            raise
+        return staged, spool
+
+    def publish_notes(self, batch):
+        # друга половина, лише в GUI-потоці: підготовлені нотатки з'являються в списку разом, одним version
+        staged, spool = batch
+        for note in staged:
+            content = self._staged_bodies.pop(note["id"], None)
+            if content is not None:
+                self.bodies.put(note["id"], content)
+        if not staged:
+            spool.close()
+            return []
+        start = len(self.notes)
+        self.notes.extend(staged)
+        self._reindex_positions(start)
+        self.version += 1
+        if self.storage.row_updates:
+            self.writer.submit(partial(self._insert_spooled, start, spool), group="notes")
+        else:
+            spool.close()
+            self.save_notes()
+        return [note["id"] for note in staged]
+
+    def _insert_spooled(self, index, spool):
+        try:
+            self.storage.insert_notes(index, spool)
+        finally:
+            spool.close()
+
+    def update_note(self, note_id, content, title=None, tags=None):
+        note = self.get_note(note_id)
+        if note is None:
+            return
+        self._set_content(note, content)
+        self._revisions[note_id] = self._revisions.get(note_id, 0) + 1
+        if title is not None:
+            note["title"] = title
+        if tags is not None:
+            note["tags"] = tags
+        self.version += 1
+        self._index_note(note, content)
+        self._persist_note_change("update_note", self._positions[note_id], self._stored_note(note, content),
+                                  key=("update", note_id))
+
+    def delete_note(self, note_id):
+        index = self._positions.pop(note_id, None)
+        if index is None:
+            return
+        del self.notes[index]
+        self.version += 1
+        self._reindex_positions(index)
+        self.search_index.remove(note_id)
+        self.bodies.discard(note_id)
+        # імпорт може повернути нотатку з тим самим id, і її фрагменти не мають братися з кешу
+        self._revisions[note_id] = self._revisions.get(note_id, 0) + 1
+        self._persist_note_change("delete_note", index, note_id)
+
+    def move_note(self, note_id, target):
+        source = self._positions.get(note_id)
+        if source is None or not 0 <= target <= len(self.notes):
+            return
+        target = min(target, len(self.notes) - 1)
+        if source == target:
+            return
+        self.notes.insert(target, self.notes.pop(source))
+        self.version += 1
+        self._reindex_positions(min(source, target), max(source, target) + 1)
+        self._persist_note_change("move_note", source, target, note_id)
+
+    def save_search_index(self):
+        if not self.index_file or not self.search_index.dirty:
+            return
+        temp_path = self.index_file + ".tmp"
+        try:
+            with self.search_index.lock:
+                write_index_file(temp_path, *self.search_index.export_postings())
+                # відображений у пам'ять файл має бути закритий до заміни, інакше Windows не дозволить її
+                self.search_index.detach_base()
+                try:
+                    os.replace(temp_path, self.index_file)
+                except OSError:
+                    # без відображеного файлу частина нотаток випала б із пошуку, тож індекс збирається заново
+                    self.rebuild_search_index()
+                    raise
+                base = MappedGramIndex.open(self.index_file)
+                if base is None:
+                    self.rebuild_search_index()
+                else:
+                    self.search_index.rebase(base)
+        except Exception as e:
+            print(f"Помилка збереження пошукового індексу: {e}")
+
+    def close(self):
+        self.save_search_index()
+        self.writer.close()
+        self.storage.close()
+
+    def load_tags(self):
+        data = self.storage.load_tags()
+        if data is not None:
+            return {tag["name"]: tag["color"] for tag in data}
+        return {
+            "запис": "#cccccc",
+            "важливо": "#ff9999",
+            "ідея": "#99ff99",
+            "робота": "#9999ff",
+            "особисте": "#ffcc99"
+        }
+
+    def save_tags(self):
+        self.writer.submit(partial(self.storage.save_tags, dict(self.tags)), group="tags", replaces_group=True)
+
+    def get_tags(self):
+        return self.tags 
+    
+    def get_tag_colors(self):
+        return self.tags
+
+    def add_tag(self, name, color="#cccccc"):
+        if name not in self.tags:
+            self.tags[name] = color
+            self.save_tags()
+
+    def delete_tags(self, names):
+        for name in names:
+            self.tags.pop(name, None)
+        self.save_tags()
+
+
+REMINDER_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+def current_msecs():
+    return int(time.time() * 1000)
+
+class ReminderBook:
+    # нагадування та їхній розклад без таймерів і сповіщень: ними керує графічна оболонка;
+    # зміни дописуються до журналу, а повний файл перезаписується лише під час ущільнення
+    def __init__(self, filename="reminders.json", compact_every=200):
+        self.filename = resource_path(filename)
+        self.journal_file = self.filename + ".journal"
+        self.compact_every = compact_every
+        self.reminders = {}
+        self.scheduler = ReminderScheduler()
+        self._ids = itertools.count()
+        self._changes = []
+        self._snapshot_crc = 0
+        self._journal_records = 0
+
+    def add(self, note_text, due_msecs):
+        reminder_id = next(self._ids)
+        reminder = {
+            "text": note_text,
+            "datetime": datetime.fromtimestamp(due_msecs / 1000).strftime(REMINDER_DATETIME_FORMAT)
+        }
+        self.reminders[reminder_id] = reminder
+        self._changes.append({"op": "add", "reminder": reminder})
+        self.scheduler.push(reminder_id, due_msecs)
+        return reminder_id
+
+    def cancel(self, reminder_id):
+        self.scheduler.cancel(reminder_id)
+        reminder = self.reminders.pop(reminder_id, None)
+        if reminder is None:
+            return False
+        self._changes.append({"op": "remove", "reminder": reminder})
+        return True
+
+    def get_reminders(self):
+        return list(self.reminders.values())
+
+    def next_due(self):
+        return self.scheduler.next_due()
+
+    def pop_due(self, now_msecs=None):
+        now_msecs = current_msecs() if now_msecs is None else now_msecs
+        due = []
+        for reminder_id in self.scheduler.pop_due(now_msecs):
+            reminder = self.reminders.pop(reminder_id, None)
+            if reminder is not None:
+                self._changes.append({"op": "remove", "reminder": reminder})
+                due.append(reminder)
+        return due
+
+    def load(self, now_msecs=None):
+        now_msecs = current_msecs() if now_msecs is None else now_msecs
+        self.reminders.clear()
+        self.scheduler.clear()
+        self._changes = []
+        reminders, damaged = self._load_all_reminders()
+        for reminder in reminders:
+            try:
+                due = int(datetime.strptime(reminder["datetime"], REMINDER_DATETIME_FORMAT).timestamp() * 1000)
+                reminder_id = next(self._ids)
+                self.reminders[reminder_id] = reminder
+                if now_msecs < due:
+                    self.scheduler.push(reminder_id, due)
+            except Exception as e:
+                print(f"Помилка при завантаженні нагадування: {e}")
+        if damaged:
+            # після обірваного запису журнал не можна дописувати, тож стан одразу переписується цілим файлом
+            self.compact()
+
+    def save(self):
+        if not self._changes:
+            return
+        changes, self._changes = self._changes, []
+        try:
+            with open(self.journal_file, "a", encoding="utf-8") as f:
+                if f.tell() == 0 or self._journal_records == 0:
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps({"snapshot": self._snapshot_crc}) + "\n")
+                for change in changes:
+                    f.write(json.dumps(change, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_records += len(changes)
+            if self._journal_records >= self.compact_every:
+                self.compact()
+        except Exception as e:
+            print(f"Помилка при збереженні нагадувань: {e}")
+
+    def compact(self):
+        try:
+            data = json.dumps(list(self.reminders.values()), ensure_ascii=False, indent=2).encode("utf-8")
+            atomic_write(self.filename, data)
+            self._snapshot_crc = zlib.crc32(data)
+            self._journal_records = 0
+            self._changes = []
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+        except Exception as e:
+            print(f"Помилка при збереженні нагадувань: {e}")
+
+    def _load_all_reminders(self):
+        # повертає збережені нагадування з уже застосованим журналом і ознаку обірваного журналу
+        raw = b""
+        reminders = []
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, "rb") as f:
+                    raw = f.read()
+                reminders = json.loads(raw.decode("utf-8"))
+            except Exception:
+                reminders = []
+        self._snapshot_crc = zlib.crc32(raw)
+        self._journal_records = 0
+        damaged = False
+        try:
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                try:
+                    header = json.loads(f.readline())
+                except json.JSONDecodeError:
+                    header = None
+                # журнал, уже влитий до файлу перед збоєм, пропускається
+                if isinstance(header, dict) and header.get("snapshot") == self._snapshot_crc:
+                    for line in f:
+                        try:
+                            change = json.loads(line)
+                        except json.JSONDecodeError:
+                            damaged = True
+                            break
+                        if change["op"] == "add":
+                            reminders.append(change["reminder"])
+                        elif change["reminder"] in reminders:
+                            # однакові нагадування нерозрізненні, тож прибирається будь-яке з них
+                            reminders.remove(change["reminder"])
+                        self._journal_records += 1
+        except FileNotFoundError:
+            pass
+        return reminders, damaged
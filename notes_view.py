@@ -0,0 +1,363 @@
+from PyQt6.QtWidgets import QListView, QStyledItemDelegate, QAbstractItemView
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QSize, QRect, QRectF, QMimeData, pyqtSignal
+from PyQt6.QtGui import QDrag, QColor, QPen, QPainter, QPixmap, QFont, QTextDocument
+from styles import Styles
+from cache import LruCache
+import html
+
+
+def preview_text(preview):
+    return preview[:60] + "..." if len(preview) > 60 else preview
+
+
+def snippet_html(snippet, highlight_color):
+    text, highlights = snippet
+    parts = []
+    position = 0
+    for start, end in highlights:
+        parts.append(html.escape(text[position:start]))
+        parts.append(f'<span style="background-color: {highlight_color};">{html.escape(text[start:end])}</span>')
+        position = end
+    parts.append(html.escape(text[position:]))
+    return "".join(parts)
+
+
+class NotesListModel(QAbstractListModel):
+    NoteRole = Qt.ItemDataRole.UserRole + 1
+    MatchRole = Qt.ItemDataRole.UserRole + 2
+    HiddenRole = Qt.ItemDataRole.UserRole + 3
+    DropTargetRole = Qt.ItemDataRole.UserRole + 4
+    SnippetRole = Qt.ItemDataRole.UserRole + 5
+
+    def __init__(self, backend, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.matches = None
+        # порядок нотаток, для якого пораховано matches: після змін збіги переносяться за id
+        self.match_ids = ()
+        # запит, збіги якого показуються на картках замість початку тексту
+        self.snippet_query = ""
+        self.hidden_ids = set()
+        self.drop_target = None
+        # у ранжованому режимі спершу показуються найрелевантніші нотатки: рядок -> індекс нотатки
+        self.ranked_ids = []
+        self.order = None
+        self.rows = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.backend.note_count()
+
+    def note_index(self, row):
+        return self.order[row] if self.order is not None and row < len(self.order) else row
+
+    def row_of(self, note_index):
+        return self.rows.get(note_index, -1) if self.rows is not None else note_index
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        row = index.row()
+        note_index = self.note_index(row)
+        note = self.backend.note_at(note_index) if index.isValid() else None
+        if note is None:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return note.get("title") or "Без назви"
+        if role == self.NoteRole:
+            return note
+        if role == self.MatchRole:
+            return self.matches is None or note_index >= len(self.matches) or self.matches[note_index]
+        if role == self.HiddenRole:
+            return note["id"] in self.hidden_ids
+        if role == self.DropTargetRole:
+            return row == self.drop_target
+        if role == self.SnippetRole:
+            if not self.snippet_query or not self.data(index, self.MatchRole):
+                return None
+            return self.backend.get_note_snippet(note["id"], self.snippet_query)
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.ItemIsDropEnabled
+        return (Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+                | Qt.ItemFlag.ItemIsDragEnabled | Qt.ItemFlag.ItemIsDropEnabled)
+
+    def refresh(self):
+        self.beginResetModel()
+        note_ids = self.backend.note_ids()
+        if self.matches is not None and note_ids != self.match_ids:
+            # нові нотатки лишаються незатемненими, доки їх не перевірить наступний пошук
+            matched = dict(zip(self.match_ids, self.matches))
+            self.matches = [matched.get(note_id, True) for note_id in note_ids]
+            self.match_ids = note_ids
+        self.drop_target = None
+        self.hidden_ids = {note_id for note_id in self.hidden_ids if self.backend.index_of(note_id) >= 0}
+        self._update_order()
+        self.endResetModel()
+
+    def set_ranking(self, note_ids):
+        self.beginResetModel()
+        self.ranked_ids = list(note_ids or [])
+        self.drop_target = None
+        self._update_order()
+        self.endResetModel()
+
+    def _update_order(self):
+        first = [index for index in map(self.backend.index_of, self.ranked_ids) if index >= 0]
+        if not first:
+            self.order = self.rows = None
+            return
+        ranked = set(first)
+        self.order = first + [index for index in range(self.backend.note_count()) if index not in ranked]
+        self.rows = {note_index: row for row, note_index in enumerate(self.order)}
+
+    def note_changed(self, note_index):
+        self._emit_row_changed(self.row_of(note_index), [Qt.ItemDataRole.DisplayRole, self.NoteRole])
+
+    def set_matches(self, matches, snippet_query=""):
+        self.matches = list(matches)
+        self.match_ids = self.backend.note_ids()
+        self.snippet_query = snippet_query
+        self._emit_all_changed([self.MatchRole, self.SnippetRole])
+
+    def set_hidden(self, note_id, hidden):
+        if hidden:
+            self.hidden_ids.add(note_id)
+        else:
+            self.hidden_ids.discard(note_id)
+        self._emit_row_changed(self.row_of(self.backend.index_of(note_id)), [self.HiddenRole])
+
+    def set_drop_target(self, row):
+        previous = self.drop_target
+        self.drop_target = row
+        for changed in (previous, row):
+            if changed is not None:
+                self._emit_row_changed(changed, [self.DropTargetRole])
+
+    def _emit_row_changed(self, row, roles):
+        if 0 <= row < self.rowCount():
+            index = self.index(row)
+            self.dataChanged.emit(index, index, roles)
+
+    def _emit_all_changed(self, roles):
+        count = self.rowCount()
+        if count:
+            self.dataChanged.emit(self.index(0), self.index(count - 1), roles)
+
+
+class CardPixmapCache:
+    def __init__(self, backend, max_bytes=32 * 1024 * 1024):
+        self.backend = backend
+        # вартість запису — розмір растра в байтах, тож кеш обмежений обсягом пам'яті
+        self.pixmaps = LruCache(max_bytes, cost=lambda pixmap: pixmap.width() * pixmap.height() * 4)
+
+    def content_hash(self, note):
+        tags = note.get("tags", "")
+        tag_colors = self.backend.get_tag_colors()
+        colors = tuple(tag_colors.get(tag.lstrip('#')) for tag in tags.split())
+        return hash((note.get("title", ""), self.backend.get_note_preview(note["id"]), tags, colors))
+
+    def pixmap(self, note, is_dark_mode, size_class, font, device_pixel_ratio=1.0, snippet=None):
+        # ключ не містить id нотатки, тому однакові картки рендеряться один раз
+        key = (self.content_hash(note), is_dark_mode, size_class, font.key(), device_pixel_ratio, snippet)
+        pixmap = self.pixmaps.get(key)
+        if pixmap is None:
+            pixmap = self.render(note, is_dark_mode, Styles.SCREEN_STYLES[size_class], font, device_pixel_ratio,
+                                 snippet)
+            self.pixmaps.put(key, pixmap)
+        return pixmap
+
+    def render(self, note, is_dark_mode, current_style, font, device_pixel_ratio=1.0, snippet=None):
+        note_width, note_height = current_style['note_size']
+        pixmap = QPixmap(round(note_width * device_pixel_ratio), round(note_height * device_pixel_ratio))
+        pixmap.setDevicePixelRatio(device_pixel_ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        self.paint_card(painter, QRect(0, 0, note_width, note_height), note, is_dark_mode, current_style, font,
+                        snippet)
+        painter.end()
+        return pixmap
+
+    def paint_card(self, painter, rect, note, is_dark_mode, current_style, base_font, snippet=None):
+        theme = Styles.get_theme_styles(is_dark_mode)
+        padding = int(current_style['button_padding'].replace('px', ''))
+        font_size = int(current_style['note_font'].replace('px', ''))
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(QColor(theme['border']), 1))
+        painter.setBrush(QColor(theme['note_bg']))
+        painter.drawRoundedRect(rect.adjusted(0, 0, -1, -1), 15, 15)
+
+        inner = rect.adjusted(padding * 2, padding * 2, -padding * 2, -padding * 2)
+        title_font = QFont(base_font)
+        title_font.setPixelSize(font_size)
+        title_font.setBold(True)
+        text_font = QFont(base_font)
+        text_font.setPixelSize(font_size)
+        painter.setPen(QColor(theme['text']))
+
+        painter.setFont(title_font)
+        title_height = painter.fontMetrics().lineSpacing() * 2
+        title_rect = QRect(inner.x(), inner.y(), inner.width(), title_height)
+        painter.drawText(title_rect, Qt.TextFlag.TextWordWrap, note.get("title") or "Без назви")
+
+        painter.setFont(text_font)
+        metrics = painter.fontMetrics()
+        tags = note.get("tags", "").split()
+        tag_height = metrics.height() + 12 if tags else 0
+        content_rect = QRect(inner.x(), title_rect.bottom() + 5, inner.width(),
+                             inner.bottom() - title_rect.bottom() - 5 - tag_height)
+        if snippet is None:
+            painter.drawText(content_rect, Qt.TextFlag.TextWordWrap,
+                             preview_text(self.backend.get_note_preview(note["id"])))
+        else:
+            # фрагмент зі збігами малюється як rich text, щоб підсвітити знайдені слова
+            document = QTextDocument()
+            document.setDocumentMargin(0)
+            document.setDefaultFont(text_font)
+            document.setTextWidth(content_rect.width())
+            document.setHtml(f'<span style="color: {theme["text"]};">'
+                             f'{snippet_html(snippet, theme["highlight"])}</span>')
+            painter.save()
+            painter.translate(content_rect.topLeft())
+            document.drawContents(painter, QRectF(0, 0, content_rect.width(), content_rect.height()))
+            painter.restore()
+
+        if tags:
+            tag_colors = self.backend.get_tag_colors()
+            x = inner.x()
+            y = inner.bottom() - tag_height
+            for tag in tags:
+                tag_width = metrics.horizontalAdvance(tag) + 24
+                if x + tag_width > inner.right() and x != inner.x():
+                    break
+                tag_rect = QRect(x, y, min(tag_width, inner.width()), tag_height)
+                painter.setPen(Qt.PenStyle.NoPen)
+                painter.setBrush(QColor(tag_colors.get(tag.lstrip('#'), '#dddddd')))
+                painter.drawRoundedRect(tag_rect, 10, 10)
+                painter.setPen(QColor("black"))
+                painter.drawText(tag_rect, Qt.AlignmentFlag.AlignCenter, tag)
+                x += tag_width + 5
+
+
+class NoteCardDelegate(QStyledItemDelegate):
+    def __init__(self, backend, card_cache, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.card_cache = card_cache
+        self.is_dark_mode = False
+        self.size_class = 'large'
+        self.current_style = Styles.SCREEN_STYLES[self.size_class]
+
+    def sizeHint(self, option, index):
+        note_width, note_height = self.current_style['note_size']
+        return QSize(note_width, note_height)
+
+    def card_rect(self, option_rect):
+        note_width, note_height = self.current_style['note_size']
+        x = option_rect.x() + (option_rect.width() - note_width) // 2
+        y = option_rect.y() + (option_rect.height() - note_height) // 2
+        return QRect(x, y, note_width, note_height)
+
+    def paint(self, painter, option, index):
+        if index.data(NotesListModel.HiddenRole):
+            return
+        note = index.data(NotesListModel.NoteRole)
+        if note is None:
+            return
+        painter.save()
+        if index.data(NotesListModel.DropTargetRole):
+            painter.setOpacity(0.6)
+        elif not index.data(NotesListModel.MatchRole):
+            painter.setOpacity(0.3)
+        pixmap = self.render_card(note, option.font, painter.device().devicePixelRatioF(),
+                                  index.data(NotesListModel.SnippetRole))
+        painter.drawPixmap(self.card_rect(option.rect).topLeft(), pixmap)
+        painter.restore()
+
+    def render_card(self, note, font, device_pixel_ratio=1.0, snippet=None):
+        return self.card_cache.pixmap(note, self.is_dark_mode, self.size_class, font, device_pixel_ratio, snippet)
+
+
+class NotesGridView(QListView):
+    note_clicked = pyqtSignal(str)
+    note_context_menu_requested = pyqtSignal(object, str)
+    note_moved = pyqtSignal(str, int)
+
+    def __init__(self, backend, card_cache, parent=None):
+        super().__init__(parent)
+        self.notes_model = NotesListModel(backend, self)
+        self.delegate = NoteCardDelegate(backend, card_cache, self)
+        self.setModel(self.notes_model)
+        self.setItemDelegate(self.delegate)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setMovement(QListView.Movement.Static)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setDragEnabled(True)
+        self.setAcceptDrops(True)
+        self.setDropIndicatorShown(False)
+        self.setDragDropMode(QAbstractItemView.DragDropMode.DragDrop)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.setFrameShape(QListView.Shape.NoFrame)
+        self.clicked.connect(lambda index: self.note_clicked.emit(self.note_id_at(index)))
+        self.customContextMenuRequested.connect(self._handle_context_menu)
+
+    def set_screen_style(self, current_style, size_class):
+        self.delegate.current_style = current_style
+        self.delegate.size_class = size_class
+        note_width, note_height = current_style['note_size']
+        spacing = int(current_style['spacing'].replace('px', ''))
+        self.setGridSize(QSize(note_width + spacing, note_height + spacing))
+
+    def set_dark_mode(self, is_dark_mode):
+        self.delegate.is_dark_mode = is_dark_mode
+        self.viewport().update()
+
+    def note_id_at(self, index):
+        return index.data(NotesListModel.NoteRole)["id"]
+
+    def card_rect(self, row):
+        return self.delegate.card_rect(self.visualRect(self.notes_model.index(row)))
+
+    def _handle_context_menu(self, pos):
+        index = self.indexAt(pos)
+        if index.isValid():
+            self.note_context_menu_requested.emit(self.viewport().mapToGlobal(pos), self.note_id_at(index))
+
+    def startDrag(self, supported_actions):
+        index = self.currentIndex()
+        if not index.isValid():
+            return
+        drag = QDrag(self)
+        mime_data = QMimeData()
+        mime_data.setText(self.note_id_at(index))
+        drag.setMimeData(mime_data)
+        drag.setPixmap(self.delegate.render_card(index.data(NotesListModel.NoteRole), self.font(),
+                                                 self.devicePixelRatioF()))
+        drag.exec(Qt.DropAction.MoveAction)
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasText():
+            event.acceptProposedAction()
+
+    def dragMoveEvent(self, event):
+        index = self.indexAt(event.position().toPoint())
+        self.notes_model.set_drop_target(index.row() if index.isValid() else None)
+        event.acceptProposedAction()
+
+    def dragLeaveEvent(self, event):
+        self.notes_model.set_drop_target(None)
+        event.accept()
+
+    def dropEvent(self, event):
+        self.notes_model.set_drop_target(None)
+        source_id = event.mimeData().text()
+        source_row = self.notes_model.backend.index_of(source_id)
+        index = self.indexAt(event.position().toPoint())
+        target_row = self.notes_model.note_index(index.row()) if index.isValid() else -1
+        if target_row >= 0 and source_row >= 0 and target_row != source_row:
+            self.note_moved.emit(source_id, target_row)
+        event.acceptProposedAction()
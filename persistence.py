@@ -0,0 +1,93 @@
+import threading
+import time
+
+
+class WriteBehindWriter:
+    def __init__(self, debounce=0.3, max_delay=2.0):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._ops = []
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._flush_requested = False
+        self._first_submit = None
+        self._last_submit = None
+        self._thread = threading.Thread(target=self._run, name="notes-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, group, key=None, replaces_group=False):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBehindWriter is closed")
+            if replaces_group:
+                # повний запис групи робить усі попередні зміни цієї групи зайвими
+                self._ops = [op for op in self._ops if op[0] != group]
+            elif key is not None:
+                last = self._last_op(group)
+                if last is not None and self._ops[last][1] == key:
+                    self._ops[last] = (group, key, func)
+                    self._mark_submitted()
+                    return
+            self._ops.append((group, key, func))
+            self._mark_submitted()
+
+    def _last_op(self, group):
+        for i in range(len(self._ops) - 1, -1, -1):
+            if self._ops[i][0] == group:
+                return i
+        return None
+
+    def _mark_submitted(self):
+        now = time.monotonic()
+        if self._first_submit is None:
+            self._first_submit = now
+        self._last_submit = now
+        self._cond.notify_all()
+
+    def pending(self):
+        with self._cond:
+            return len(self._ops) + (1 if self._busy else 0)
+
+    def flush(self, timeout=None):
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            done = self._cond.wait_for(lambda: not self._ops and not self._busy, timeout)
+            self._flush_requested = False
+            return done
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _wait_for_batch(self):
+        while not self._ops and not self._closed:
+            self._cond.wait()
+        while self._ops and not self._flush_requested and not self._closed:
+            deadline = min(self._last_submit + self.debounce, self._first_submit + self.max_delay)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._cond.wait(remaining)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._wait_for_batch()
+                if not self._ops and self._closed:
+                    return
+                ops, self._ops = self._ops, []
+                self._first_submit = None
+                self._busy = True
+            for group, key, func in ops:
+                try:
+                    func()
+                except Exception as e:
+                    print(f"Помилка збереження даних: {e}")
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
@@ -0,0 +1,129 @@
+import re
+from datetime import date, timedelta
+from cache import LruCache
+from normalizer import normalize_text
+
+# слово, фраза в лапках або поле:значення; "-" перед будь-яким із них виключає збіги
+TOKEN_RE = re.compile(r'(-?)(?:(\w+):)?(?:"([^"]*)"?|(\S+))')
+DATE_RE = re.compile(r"(>=|<=|>|<|=)?(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$")
+FIELDS = {
+    "title": "title", "заголовок": "title",
+    "content": "content", "текст": "content",
+    "tag": "tag", "тег": "tag",
+    "created": "created", "створено": "created",
+}
+PLAN_CACHE_SIZE = 256
+
+
+class Clause:
+    # вузол запиту: kind — "text", "tag" або "created"; усі вузли запиту поєднуються через "і"
+    def __init__(self, kind, value, field=None, negated=False, phrase=False, low=None, high=None):
+        self.kind = kind
+        self.value = value
+        self.field = field
+        self.negated = negated
+        self.phrase = phrase
+        self.low = low
+        self.high = high
+
+    @property
+    def word(self):
+        # звичайне слово запиту: у ранжованому й нечіткому пошуку воно ранжується, а не фільтрує
+        return self.kind == "text" and not self.field and not self.phrase and not self.negated
+
+
+def date_bounds(value):
+    # повертає межі [low, high) у форматі дати створення нотатки або None, якщо дату не розібрано
+    if ".." in value:
+        start, _, end = value.partition("..")
+        first = date_bounds(start) if start else (None, None)
+        last = date_bounds(end) if end else (None, None)
+        if first is None or last is None:
+            return None
+        return first[0], last[1]
+    match = DATE_RE.match(value)
+    if not match:
+        return None
+    op, year, month, day = match.groups()
+    try:
+        start = date(int(year), int(month or 1), int(day or 1))
+        if day:
+            end = start + timedelta(days=1)
+        elif month:
+            end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            end = start.replace(year=start.year + 1)
+    except ValueError:
+        return None
+    low, high = start.isoformat(), end.isoformat()
+    if op == ">":
+        return high, None
+    if op == ">=":
+        return low, None
+    if op == "<":
+        return None, low
+    if op == "<=":
+        return None, high
+    return low, high
+
+
+def parse_query(text):
+    clauses = []
+    for match in TOKEN_RE.finditer(text):
+        negated, field, quoted, value = match.groups()
+        raw = match.group(0)[len(negated):]
+        if value is not None and value.endswith(":") and value[:-1].casefold() in FIELDS:
+            # поле ще набирається
+            continue
+        field = FIELDS.get(field.casefold()) if field else None
+        value = quoted if quoted is not None else value
+        if field == "tag":
+            clauses.append(Clause("tag", value, negated=bool(negated)))
+            continue
+        if field == "created":
+            bounds = date_bounds(value)
+            if bounds is not None:
+                clauses.append(Clause("created", value, negated=bool(negated), low=bounds[0], high=bounds[1]))
+                continue
+            field = None
+        if field is None and match.group(2):
+            # невідоме поле на кшталт 10:30 шукається як звичайний текст
+            value, quoted = raw, None
+        value = normalize_text(value)
+        if value:
+            clauses.append(Clause("text", value, field, bool(negated), phrase=quoted is not None))
+    return clauses
+
+
+class QueryPlan:
+    def __init__(self, text):
+        clauses = parse_query(text)
+        self.clauses = clauses
+        # точні індекси (теги, дата створення) виконуються першими, від найвибірковішого, — порядок
+        # між ними визначається під час виконання, бо залежить від поточних розмірів множин
+        self.index_clauses = [clause for clause in clauses if clause.kind != "text"]
+        text_clauses = [clause for clause in clauses if clause.kind == "text"]
+        # довші підрядки вибірковіші, тож їхні кандидати з триграм перетинаються першими
+        self.gram_clauses = sorted((clause for clause in text_clauses if not clause.negated),
+                                   key=lambda clause: -len(clause.value))
+        # перевірка заголовка не читає вміст нотатки, тож іде першою, а виключення — останніми
+        self.checks = sorted(text_clauses, key=lambda clause: (clause.negated, clause.field != "title"))
+        words = [clause.value for clause in clauses if clause.word]
+        trailing = text[-1:].isspace() or not clauses or not clauses[-1].word
+        self.rank_text = " ".join(words) + (" " if words and trailing else "")
+        self.words = words
+
+    def __bool__(self):
+        return bool(self.clauses)
+
+
+_plans = LruCache(PLAN_CACHE_SIZE, cost=lambda plan: 1)
+
+
+def compile_query(text):
+    # той самий рядок запиту набирається й уточнюється багато разів, тож розібрані плани кешуються
+    plan = _plans.get(text)
+    if plan is None:
+        plan = QueryPlan(text)
+        _plans.put(text, plan)
+    return plan
@@ -0,0 +1,137 @@
+import heapq
+import math
+from bisect import bisect_left
+from collections import Counter
+from normalizer import analyze, stems
+
+# поля нотатки в порядку ваги: збіг у тегах важить більше, ніж у заголовку, а той — більше, ніж у тексті
+FIELD_WEIGHTS = (3.0, 2.0, 1.0)
+FIELD_B = (0.3, 0.75, 0.75)
+K1 = 1.2
+TF_BITS = 20
+TF_MASK = (1 << TF_BITS) - 1
+NORM_DRIFT = 0.05
+PREFIX_LIMIT = 64
+
+
+class Bm25Index:
+    def __init__(self):
+        # для кожного терміна: нотатка -> частоти в полях, упаковані в одне ціле число
+        self.postings = {}
+        self.doc_terms = {}
+        self.lengths = {}
+        self.total_lengths = [0, 0, 0]
+        # ваги полів з урахуванням довжини нотатки рахуються наперед і оновлюються, лише коли середні довжини помітно зміняться
+        self.norms = {}
+        self.norm_lengths = None
+        self._vocabulary = None
+        self.vocabulary_version = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, key, tags, title, content):
+        # поля приходять уже нормалізованими, тож лишається розбити їх на основи слів
+        if key in self.lengths:
+            self.remove(key)
+        counters = [Counter(stems(text)) for text in (tags, title, content)]
+        lengths = tuple(sum(counter.values()) for counter in counters)
+        terms = set().union(*counters)
+        for term in terms:
+            packed = 0
+            for field, counter in enumerate(counters):
+                packed |= min(counter.get(term, 0), TF_MASK) << (field * TF_BITS)
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._vocabulary = None
+                self.vocabulary_version += 1
+            postings[key] = packed
+        self.doc_terms[key] = tuple(terms)
+        self.lengths[key] = lengths
+        for field in range(3):
+            self.total_lengths[field] += lengths[field]
+        if self.norm_lengths is not None:
+            self.norms[key] = self._norm(lengths, self.norm_lengths)
+
+    def remove(self, key):
+        lengths = self.lengths.pop(key, None)
+        if lengths is None:
+            return
+        for term in self.doc_terms.pop(key):
+            postings = self.postings[term]
+            del postings[key]
+            if not postings:
+                del self.postings[term]
+                self._vocabulary = None
+                self.vocabulary_version += 1
+        for field in range(3):
+            self.total_lengths[field] -= lengths[field]
+        self.norms.pop(key, None)
+
+    def average_lengths(self):
+        count = len(self.lengths) or 1
+        return tuple(max(total / count, 1.0) for total in self.total_lengths)
+
+    @staticmethod
+    def _norm(lengths, averages):
+        return tuple(FIELD_WEIGHTS[field] / (1 - FIELD_B[field] + FIELD_B[field] * lengths[field] / averages[field])
+                     for field in range(3))
+
+    def _refresh_norms(self):
+        averages = self.average_lengths()
+        if self.norm_lengths is not None and all(
+                abs(current - used) <= NORM_DRIFT * used for current, used in zip(averages, self.norm_lengths)):
+            return
+        self.norm_lengths = averages
+        self.norms = {key: self._norm(lengths, averages) for key, lengths in self.lengths.items()}
+
+    def expand(self, prefix):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        vocabulary = self._vocabulary
+        terms = []
+        position = bisect_left(vocabulary, prefix)
+        while position < len(vocabulary) and vocabulary[position].startswith(prefix) and len(terms) < PREFIX_LIMIT:
+            terms.append(vocabulary[position])
+            position += 1
+        return terms
+
+    def query_terms(self, query):
+        terms = analyze(query)
+        if not terms:
+            return []
+        # останнє слово ще може набиратися, тому воно шукається як префікс
+        if query[-1:].isspace() or terms[-1] in self.postings:
+            return list(dict.fromkeys(terms))
+        return list(dict.fromkeys(terms[:-1] + (self.expand(terms[-1]) or terms[-1:])))
+
+    def scores(self, query, keys=None):
+        return self.score_terms(dict.fromkeys(self.query_terms(query), 1.0), keys)
+
+    def score_terms(self, terms, keys=None):
+        # terms: термін -> вага його внеску, наприклад менша для схожих, але не точних слів
+        self._refresh_norms()
+        count = len(self.lengths)
+        scores = {}
+        for term, weight in terms.items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = weight * math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for key, packed in postings.items():
+                if keys is not None and key not in keys:
+                    continue
+                norm = self.norms[key]
+                tf = (norm[0] * (packed & TF_MASK) + norm[1] * ((packed >> TF_BITS) & TF_MASK)
+                      + norm[2] * (packed >> (2 * TF_BITS)))
+                scores[key] = scores.get(key, 0.0) + idf * tf * (K1 + 1) / (tf + K1)
+        return scores
+
+    def top(self, query, limit, keys=None):
+        return self.top_scores(self.scores(query, keys), limit)
+
+    @staticmethod
+    def top_scores(scores, limit):
+        return heapq.nlargest(limit, scores, key=scores.__getitem__), scores
@@ -0,0 +1,60 @@
+import heapq
+import itertools
+
+
+class ReminderScheduler:
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._cancelled = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def push(self, key, due):
+        if key in self._entries:
+            self.cancel(key)
+        entry = [due, next(self._counter), key, True]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def cancel(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        # скасовані записи лишаються в купі до виштовхування, а при надлишку купа перебудовується
+        entry[3] = False
+        self._cancelled += 1
+        if self._cancelled > len(self._entries) and self._cancelled > 64:
+            self._heap = [e for e in self._heap if e[3]]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        return True
+
+    def clear(self):
+        self._heap = []
+        self._entries.clear()
+        self._cancelled = 0
+
+    def _drop_cancelled(self):
+        while self._heap and not self._heap[0][3]:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+
+    def next_due(self):
+        self._drop_cancelled()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        due = []
+        self._drop_cancelled()
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            del self._entries[entry[2]]
+            due.append(entry[2])
+            self._drop_cancelled()
+        return due
@@ -0,0 +1,520 @@
+import hashlib
+import threading
+from array import array
+from bisect import bisect_left, insort
+from ranking import Bm25Index
+from fuzzy import FuzzyVocabulary
+from normalizer import analyze, normalize_text
+from query import compile_query
+
+GRAM_SIZE = 3
+RANK_LIMIT = 100
+COMPACT_MIN = 1024
+RANK_BUILD_STEP = 256
+
+
+def iter_grams(text):
+    # текст обрамлюється тим самим роздільником, тож кожен його символ і кожна пара символів входять
+    # хоча б до однієї триграми, і коротші запити можна знайти серед триграм
+    padded = "\n" + text + "\n"
+    return {padded[start:start + GRAM_SIZE] for start in range(len(padded) - GRAM_SIZE + 1)}
+
+
+def query_grams(query):
+    return {query[start:start + GRAM_SIZE] for start in range(len(query) - GRAM_SIZE + 1)}
+
+
+def containing_grams(query, grams):
+    # запит, коротший за триграму, шукається за всіма триграмами словника, що його містять
+    return [gram for gram in grams if query in gram]
+
+
+def text_fingerprint(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def iter_slots(bits):
+    flags = bin(bits)[:1:-1]
+    slot = flags.find("1")
+    while slot >= 0:
+        yield slot
+        slot = flags.find("1", slot + 1)
+
+
+def bits_from_slots(slots, slot_count):
+    bitmap = bytearray((slot_count + 7) // 8)
+    for slot in slots:
+        bitmap[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(bitmap, "little")
+
+
+def match_notes(note_ids, hits):
+    if hits is None:
+        return [True] * len(note_ids)
+    return [note_id in hits for note_id in note_ids]
+
+
+class GramIndex:
+    def __init__(self):
+        # для кожної триграми — масив слотів нотаток; видалена нотатка лише звільняє свій слот у keys,
+        # а масиви вичищаються разом, коли таких слотів стає більше, ніж живих
+        self.postings = {}
+        self.slots = {}
+        self.keys = []
+
+    def add(self, key, text):
+        if key in self.slots:
+            self.remove(key)
+        slot = len(self.keys)
+        self.keys.append(key)
+        self.slots[key] = slot
+        postings = self.postings
+        for gram in iter_grams(text):
+            slots = postings.get(gram)
+            if slots is None:
+                slots = postings[gram] = array("I")
+            slots.append(slot)
+
+    def remove(self, key):
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return
+        self.keys[slot] = None
+        if len(self.keys) - len(self.slots) > max(len(self.slots), COMPACT_MIN):
+            self.compact()
+
+    def compact(self):
+        remap = array("q", [-1]) * len(self.keys)
+        keys = []
+        for slot, key in enumerate(self.keys):
+            if key is not None:
+                remap[slot] = len(keys)
+                keys.append(key)
+        postings = {}
+        for gram, slots in self.postings.items():
+            live = array("I", [remap[slot] for slot in slots if remap[slot] >= 0])
+            if live:
+                postings[gram] = live
+        self.postings = postings
+        self.keys = keys
+        self.slots = {key: slot for slot, key in enumerate(keys)}
+
+    def candidates(self, query):
+        if len(query) < GRAM_SIZE:
+            result = set()
+            for gram in containing_grams(query, self.postings):
+                result.update(self.postings[gram])
+                if len(result) == len(self.keys):
+                    break
+        else:
+            lists = []
+            for gram in query_grams(query):
+                slots = self.postings.get(gram)
+                if not slots:
+                    return set()
+                lists.append(slots)
+            lists.sort(key=len)
+            result = set(lists[0])
+            for slots in lists[1:]:
+                result.intersection_update(slots)
+                if not result:
+                    return set()
+        keys = self.keys
+        return {keys[slot] for slot in result if keys[slot] is not None}
+
+
+def normalize_tag(tag):
+    return normalize_text(tag.strip().lstrip("#"))
+
+
+def parse_tag_query(query):
+    # "a b" — нотатки з усіма тегами, "a|b" — з будь-яким із них, "-a" — без тегу
+    groups = []
+    excluded = []
+    for term in query.split():
+        if term[0] in "-!" and len(term) > 1:
+            excluded.append(normalize_tag(term[1:]))
+            continue
+        alternatives = [name for name in map(normalize_tag, term.split("|")) if name]
+        if alternatives:
+            groups.append(alternatives)
+    return groups, excluded
+
+
+class TagIndex:
+    def __init__(self):
+        # для кожного тегу зберігається ціле число, у якому біт i відповідає нотатці зі слотом i
+        self.bitsets = {}
+        self.slots = {}
+        self.keys = []
+        self.free_slots = []
+        self.note_tags = {}
+        self.all_bits = 0
+
+    def add(self, key, tags):
+        if key in self.slots:
+            self.remove(key)
+        slot = self.free_slots.pop() if self.free_slots else len(self.keys)
+        if slot == len(self.keys):
+            self.keys.append(key)
+        else:
+            self.keys[slot] = key
+        self.slots[key] = slot
+        bit = 1 << slot
+        self.all_bits |= bit
+        names = {name for name in map(normalize_tag, tags.split()) if name}
+        self.note_tags[key] = names
+        for name in names:
+            self.bitsets[name] = self.bitsets.get(name, 0) | bit
+
+    def remove(self, key):
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return
+        mask = ~(1 << slot)
+        for name in self.note_tags.pop(key):
+            bits = self.bitsets[name] & mask
+            if bits:
+                self.bitsets[name] = bits
+            else:
+                del self.bitsets[name]
+        self.all_bits &= mask
+        self.keys[slot] = None
+        self.free_slots.append(slot)
+
+    def query(self, groups, excluded=()):
+        bits = self.all_bits
+        for alternatives in groups:
+            any_bits = 0
+            for name in alternatives:
+                any_bits |= self.bitsets.get(name, 0)
+            bits &= any_bits
+            if not bits:
+                return 0
+        for name in excluded:
+            bits &= ~self.bitsets.get(name, 0)
+        return bits
+
+    def keys_of(self, bits):
+        return {self.keys[slot] for slot in iter_slots(bits)}
+
+    def search(self, query):
+        groups, excluded = parse_tag_query(query)
+        if not groups and not excluded:
+            return None
+        return self.keys_of(self.query(groups, excluded))
+
+
+class RankIndexBuild:
+    # незавершена побудова індексу для ранжування: скасований пошук лишає її, і наступний продовжує з того ж місця
+    def __init__(self, keys):
+        self.index = Bm25Index()
+        self.keys = keys
+        self.position = 0
+        # нотатки, змінені після знімка ключів, переіндексовуються перед заміною
+        self.touched = set()
+
+
+class SearchIndex:
+    def __init__(self, load_text=None):
+        # з load_text вміст нотаток не зберігається в індексі, а читається для перевірки збігів
+        self.load_text = load_text
+        self.docs = {}
+        self.fingerprints = {}
+        self.text_index = GramIndex()
+        self.tag_index = TagIndex()
+        # пари (дата створення, нотатка), впорядковані для пошуку за діапазоном дат
+        self.created_index = []
+        # триграми незмінених нотаток беруться зі збереженого на диску індексу, решта — з text_index
+        self.base = None
+        self.base_slots = {}
+        self._live_bits = None
+        self.dirty = False
+        # індекс для ранжування будується під час першого ранжованого запиту й далі оновлюється разом із цим
+        self.rank_index = None
+        self.rank_build = None
+        self.build_lock = threading.Lock()
+        self.fuzzy_vocabulary = FuzzyVocabulary()
+        # пошук може виконуватися у фоновому потоці, поки GUI-потік оновлює індекс
+        self.lock = threading.RLock()
+
+    def attach_base(self, base):
+        with self.lock:
+            self.detach_base()
+            self.base = base
+
+    def detach_base(self):
+        with self.lock:
+            if self.base is not None:
+                self.base.close()
+            self.base = None
+            self.base_slots = {}
+            self._live_bits = None
+
+    def add(self, key, title, content, tags, created=""):
+        # нормалізація робиться один раз під час індексації, а запит лише приводиться до того ж вигляду
+        title, content, tags = normalize_text(title), normalize_text(content), normalize_text(tags)
+        # заголовок і вміст індексуються разом, розділені символом, якого немає в запитах
+        text = title + "\n" + content
+        fingerprint = text_fingerprint(text)
+        with self.lock:
+            self.docs[key] = (title, None if self.load_text else content, tags, created)
+            self.fingerprints[key] = fingerprint
+            slot = self.base.slot_of(key, fingerprint) if self.base is not None else None
+            if slot is None:
+                self.text_index.add(key, text)
+                self.dirty = True
+            else:
+                self.base_slots[key] = slot
+                self._live_bits = None
+            self.tag_index.add(key, tags)
+            if created:
+                insort(self.created_index, (created, key))
+            if self.rank_index is not None:
+                self.rank_index.add(key, tags, title, content)
+            elif self.rank_build is not None:
+                self.rank_build.touched.add(key)
+
+    def remove(self, key):
+        with self.lock:
+            doc = self.docs.pop(key, None)
+            if doc is None:
+                return
+            del self.fingerprints[key]
+            if self.base_slots.pop(key, None) is not None:
+                self._live_bits = None
+            else:
+                self.text_index.remove(key)
+            self.tag_index.remove(key)
+            if doc[3]:
+                position = bisect_left(self.created_index, (doc[3], key))
+                del self.created_index[position]
+            if self.rank_index is not None:
+                self.rank_index.remove(key)
+            elif self.rank_build is not None:
+                self.rank_build.touched.add(key)
+            self.dirty = True
+
+    def update(self, key, title, content, tags, created=""):
+        with self.lock:
+            self.remove(key)
+            self.add(key, title, content, tags, created)
+
+    def clear(self):
+        with self.lock:
+            self.detach_base()
+            self.docs.clear()
+            self.fingerprints.clear()
+            self.text_index = GramIndex()
+            self.tag_index = TagIndex()
+            self.created_index = []
+            self.rank_index = None
+            self.rank_build = None
+            self.fuzzy_vocabulary = FuzzyVocabulary()
+            self.dirty = False
+
+    def search(self, search_text, search_tag=None):
+        with self.lock:
+            tag_result = self.tag_index.search(search_tag) if search_tag else None
+            return self._select(compile_query(search_text), tag_result)
+
+    def rank(self, search_text, search_tag=None, limit=RANK_LIMIT, cancelled=None):
+        # повертає найкращі limit нотаток за BM25 та множину всіх нотаток, що мають хоч один збіг
+        plan = compile_query(search_text)
+        if plan.words and self._rank_index(cancelled) is None:
+            return [], set()
+        with self.lock:
+            tag_result = self.tag_index.search(search_tag) if search_tag else None
+            keys = self._select(plan, tag_result, words=False)
+            if not plan.words:
+                return [], keys
+            if self.rank_index is None:
+                return [], set()
+            ranked, scores = self.rank_index.top(plan.rank_text, limit, keys)
+            return ranked, set(scores)
+
+    def fuzzy(self, search_text, search_tag=None, limit=RANK_LIMIT, cancelled=None):
+        # кожне слово запиту має збігтися зі словом нотатки з точністю до однієї-двох помилок
+        plan = compile_query(search_text)
+        terms = analyze(plan.rank_text)
+        if terms and self._rank_index(cancelled) is None:
+            return [], set()
+        with self.lock:
+            tag_result = self.tag_index.search(search_tag) if search_tag else None
+            hits = self._select(plan, tag_result, words=False)
+            if not terms:
+                return [], hits
+            rank_index = self.rank_index
+            if rank_index is None:
+                return [], set()
+            self.fuzzy_vocabulary.sync(rank_index.postings, rank_index.vocabulary_version)
+            weights = {}
+            for position, term in enumerate(terms):
+                similar = self.fuzzy_vocabulary.similar(term)
+                if position == len(terms) - 1 and not plan.rank_text[-1:].isspace():
+                    for prefixed in rank_index.expand(term):
+                        similar.setdefault(prefixed, 0)
+                keys = set()
+                for candidate, distance in similar.items():
+                    keys.update(rank_index.postings[candidate])
+                    weights[candidate] = max(weights.get(candidate, 0.0), 1.0 / (1 + distance))
+                hits = keys if hits is None else hits & keys
+                if not hits:
+                    return [], set()
+            ranked, _ = rank_index.top_scores(rank_index.score_terms(weights, hits), limit)
+            return ranked, hits
+
+    def find(self, search_text, search_tag=None, ranked=False, fuzzy=False, cancelled=None):
+        # пошук у режимі, вибраному в інтерфейсі: (найрелевантніші нотатки або None, збіги)
+        if fuzzy:
+            order, hits = self.fuzzy(search_text, search_tag, cancelled=cancelled)
+            return (order if ranked else None), hits
+        if ranked:
+            return self.rank(search_text, search_tag, cancelled=cancelled)
+        return None, self.search(search_text, search_tag)
+
+    def _rank_index(self, cancelled=None):
+        # індекс будується поза основним блокуванням, тож зміни нотаток у GUI-потоці не чекають на нього;
+        # повертає None, якщо пошук скасовано або індекс очищено під час побудови
+        with self.build_lock:
+            with self.lock:
+                if self.rank_index is not None:
+                    return self.rank_index
+                if self.rank_build is None:
+                    self.rank_build = RankIndexBuild(list(self.docs))
+                build = self.rank_build
+            keys = build.keys
+            while build.position < len(keys):
+                if cancelled is not None and build.position % RANK_BUILD_STEP == 0 and cancelled():
+                    return None
+                key = keys[build.position]
+                doc = self.docs.get(key)
+                if doc is not None:
+                    build.index.add(key, doc[2], doc[0], self._content(key, doc))
+                build.position += 1
+            with self.lock:
+                if self.rank_build is not build:
+                    return None
+                for key in build.touched:
+                    doc = self.docs.get(key)
+                    if doc is None:
+                        build.index.remove(key)
+                    else:
+                        build.index.add(key, doc[2], doc[0], self._content(key, doc))
+                self.rank_index = build.index
+                self.rank_build = None
+                return self.rank_index
+
+    def _select(self, plan, keys=None, words=True):
+        # keys — уже відібрані нотатки або None, якщо обмежень ще немає; words=False пропускає звичайні
+        # слова, які ранжований і нечіткий пошук обробляють самі
+        found = []
+        excluded = []
+        for clause in plan.index_clauses:
+            result = self._index_lookup(clause)
+            if result is not None:
+                (excluded if clause.negated else found).append(result)
+        for result in sorted(found, key=len):
+            keys = result if keys is None else keys & result
+            if not keys:
+                return set()
+        exact = set()
+        for clause in plan.gram_clauses:
+            if clause.word and not words:
+                continue
+            candidates = self._candidates(clause.value)
+            keys = candidates if keys is None else keys & candidates
+            if not keys:
+                return set()
+            # запит не довший за триграму збігається з кандидатами точно, бо текст в індексі обрамлено роздільником
+            if not clause.field and len(clause.value) <= GRAM_SIZE:
+                exact.add(clause)
+        checks = [clause for clause in plan.checks if clause not in exact and (words or not clause.word)]
+        if not excluded and not checks:
+            return keys
+        if keys is None:
+            keys = set(self.docs)
+        for result in excluded:
+            keys = keys - result
+        if checks:
+            keys = {key for key in keys if all(self._check(clause, key, self.docs[key]) for clause in checks)}
+        return keys
+
+    def _index_lookup(self, clause):
+        if clause.kind == "tag":
+            return self.tag_index.search(clause.value)
+        start = bisect_left(self.created_index, (clause.low,)) if clause.low else 0
+        stop = bisect_left(self.created_index, (clause.high,)) if clause.high else len(self.created_index)
+        return {key for _, key in self.created_index[start:stop]}
+
+    def _check(self, clause, key, doc):
+        if clause.field == "title":
+            found = clause.value in doc[0]
+        elif clause.field == "content":
+            found = clause.value in self._content(key, doc)
+        else:
+            found = clause.value in doc[0] or clause.value in self._content(key, doc)
+        return found != clause.negated
+
+    def _candidates(self, query):
+        candidates = self.text_index.candidates(query)
+        if self.base_slots:
+            bits = self.base.candidate_bits(query) & self._live()
+            if bits:
+                candidates |= self.base.keys_of(bits)
+        return candidates
+
+    def _live(self):
+        if self._live_bits is None:
+            bitmap = bytearray((self.base.slot_count + 7) // 8)
+            for slot in self.base_slots.values():
+                bitmap[slot >> 3] |= 1 << (slot & 7)
+            self._live_bits = int.from_bytes(bitmap, "little")
+        return self._live_bits
+
+    def _content(self, key, doc):
+        return doc[1] if doc[1] is not None else normalize_text(self.load_text(key))
+
+    def export_postings(self):
+        # нотатки зі збереженого індексу лишаються у своїх слотах, нові займають звільнені або додаються в кінець
+        with self.lock:
+            keys = list(self.base.keys) if self.base is not None else []
+            live = set(self.base_slots.values())
+            free = [slot for slot in range(len(keys) - 1, -1, -1) if slot not in live]
+            for slot in free:
+                keys[slot] = None
+            slot_of = dict(self.base_slots)
+            for key in self.docs:
+                if key not in slot_of:
+                    slot = free.pop() if free else len(keys)
+                    if slot == len(keys):
+                        keys.append(key)
+                    else:
+                        keys[slot] = key
+                    slot_of[key] = slot
+            fingerprints = [self.fingerprints.get(key, 0) for key in keys]
+            overlay = self.text_index
+            overlay_slots = [slot_of[key] if key is not None else None for key in overlay.keys]
+            grams = set(overlay.postings)
+            if self.base_slots:
+                grams.update(self.base.grams)
+            live_bits = self._live() if self.base_slots else 0
+
+            def postings():
+                for gram in grams:
+                    slots = (overlay_slots[slot] for slot in overlay.postings.get(gram, ()))
+                    bits = bits_from_slots((slot for slot in slots if slot is not None), len(keys))
+                    if live_bits:
+                        bits |= self.base.bits(gram) & live_bits
+                    yield gram, bits
+
+            return keys, fingerprints, postings()
+
+    def rebase(self, base):
+        # після запису файлу всі нотатки вже є в ньому, тож проміжний індекс у пам'яті більше не потрібен
+        with self.lock:
+            self.detach_base()
+            self.base = base
+            self.base_slots = {key: base.slots[key] for key in self.docs}
+            self.text_index = GramIndex()
+            self.dirty = False
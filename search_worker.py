@@ -0,0 +1,107 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from search_index import match_notes
+
+
+class SearchSignals(QObject):
+    finished = pyqtSignal(int, int, object)
+
+
+class SearchTask(QRunnable):
+    def __init__(self, searcher, generation, snapshot, search_text, search_tag, ranked=False, fuzzy=False):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.searcher = searcher
+        self.search_index = searcher.backend.search_index
+        self.signals = searcher.signals
+        self.generation = generation
+        self.version, self.note_ids = snapshot
+        self.search_text = search_text
+        self.search_tag = search_tag
+        self.ranked = ranked
+        self.fuzzy = fuzzy
+
+    def cancelled(self):
+        return self.searcher.generation != self.generation
+
+    def run(self):
+        if self.cancelled():
+            return
+        try:
+            order, hits = self.search_index.find(self.search_text, self.search_tag, self.ranked, self.fuzzy,
+                                                 self.cancelled)
+            if self.cancelled():
+                return
+            matches = match_notes(self.note_ids, hits)
+        except Exception as e:
+            print(f"Помилка пошуку: {e}")
+            return
+        self.signals.finished.emit(self.generation, self.version, (matches, order))
+
+
+class AsyncSearcher(QObject):
+    results_ready = pyqtSignal(object)
+    # порядок найрелевантніших нотаток у ранжованому режимі, None — звичайний порядок
+    order_ready = pyqtSignal(object)
+
+    def __init__(self, backend, parent=None, debounce=150):
+        super().__init__(parent)
+        self.backend = backend
+        self.debounce = debounce
+        self.generation = 0
+        self.ranked = False
+        self.fuzzy = False
+        self.query = ("", None)
+        self._task = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = SearchSignals(self)
+        self.signals.finished.connect(self._deliver)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._start)
+
+    def request(self, search_text, search_tag=None, immediate=False):
+        # кожен новий запит скасовує попередні: їхні результати вже не будуть показані
+        self.generation += 1
+        self.query = (search_text, search_tag)
+        if immediate or not search_text:
+            self.timer.stop()
+            self._start()
+        else:
+            self.timer.start(self.debounce)
+
+    def is_pending(self):
+        return self.timer.isActive() or self._task is not None
+
+    def close(self):
+        self.generation += 1
+        self.timer.stop()
+        self.pool.clear()
+        self.pool.waitForDone()
+        self._task = None
+
+    def _start(self):
+        if self._task is not None:
+            self.pool.tryTake(self._task)
+        search_text, search_tag = self.query
+        snapshot = self.backend.search_snapshot()
+        if not search_text and not search_tag:
+            self._task = None
+            self.order_ready.emit(None)
+            self.results_ready.emit([True] * len(snapshot[1]))
+            return
+        self._task = SearchTask(self, self.generation, snapshot, search_text, search_tag,
+                                self.ranked, self.fuzzy)
+        self.pool.start(self._task)
+
+    def _deliver(self, generation, version, result):
+        if generation != self.generation:
+            return
+        if version != self.backend.version:
+            # нотатки змінилися під час пошуку, тому результат застарів і запит виконується знову
+            self._start()
+            return
+        self._task = None
+        matches, order = result
+        self.order_ready.emit(order)
+        self.results_ready.emit(matches)
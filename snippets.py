@@ -0,0 +1,98 @@
+from cache import LruCache
+from fuzzy import edit_distance, max_distance
+from normalizer import TOKEN_RE, stem, token_spans
+from query import compile_query
+
+SNIPPET_LENGTH = 60
+SNIPPET_CONTEXT = 20
+MISSING = object()
+
+
+class NoteTokens:
+    # позиції слів нотатки, згруповані за нормалізованою формою: для нового запиту достатньо
+    # перевірити різні слова нотатки, а не проходити текст заново
+    def __init__(self, text):
+        self.positions = {}
+        self.count = 0
+        for start, end, token in token_spans(text):
+            self.positions.setdefault(token, []).append((start, end))
+            self.count += 1
+
+
+def query_words(search_text):
+    words = []
+    for clause in compile_query(search_text).clauses:
+        if clause.kind == "text" and not clause.negated and clause.field != "title":
+            words.extend(TOKEN_RE.findall(clause.value))
+    return list(dict.fromkeys(words))
+
+
+def token_matches(token, words, stems):
+    # слово підсвічується так само, як знаходиться: за підрядком або за основою; однолітерні слова
+    # запиту збігаються лише з такими самими словами, інакше підсвічувався б майже кожен рядок
+    return any(word in token if len(word) > 1 else word == token for word in words) or stem(token) in stems
+
+
+def token_similar(token, stems):
+    token_stem = stem(token)
+    return any(edit_distance(token_stem, query_stem, max_distance(query_stem)) <= max_distance(query_stem)
+               for query_stem in stems)
+
+
+class SnippetBuilder:
+    def __init__(self, token_budget=1_000_000, cache_size=4096):
+        self.tokens = LruCache(token_budget, cost=lambda tokens: tokens.count or 1)
+        self.snippets = LruCache(cache_size, cost=lambda snippet: 1)
+
+    def snippet(self, key, version, search_text, load_text):
+        # повертає (текст, ((початок, кінець), ...)) з найщільнішим скупченням збігів або None, якщо в тексті їх немає
+        cache_key = (key, version, search_text)
+        snippet = self.snippets.get(cache_key, MISSING)
+        if snippet is MISSING:
+            snippet = self._build(key, version, search_text, load_text)
+            self.snippets.put(cache_key, snippet)
+        return snippet
+
+    def _build(self, key, version, search_text, load_text):
+        words = query_words(search_text)
+        if not words:
+            return None
+        text = load_text()
+        tokens = self.tokens.get((key, version))
+        if tokens is None:
+            tokens = NoteTokens(text)
+            self.tokens.put((key, version), tokens)
+        stems = {stem(word) for word in words}
+        matched = sorted(span for token, spans in tokens.positions.items()
+                         if token_matches(token, words, stems) for span in spans)
+        if not matched:
+            # нечіткий пошук знаходить нотатки з опечатками в запиті, тож тоді підсвічуються схожі слова
+            matched = sorted(span for token, spans in tokens.positions.items()
+                             if token_similar(token, stems) for span in spans)
+        if not matched:
+            return None
+        best, best_count, last = 0, 0, 0
+        for first, (start, _) in enumerate(matched):
+            while last < len(matched) and matched[last][1] <= start + SNIPPET_LENGTH:
+                last += 1
+            if last - first > best_count:
+                best, best_count = first, last - first
+        anchor_start, anchor_end = matched[best]
+        start = max(0, anchor_start - SNIPPET_CONTEXT)
+        if start > 0:
+            space = text.find(" ", start, anchor_start)
+            start = space + 1 if space >= 0 else anchor_start
+        end = min(len(text), start + SNIPPET_LENGTH)
+        if end < len(text):
+            space = text.rfind(" ", anchor_end, end)
+            if space > anchor_end:
+                end = space
+        end = max(end, anchor_end)
+        prefix = "..." if start > 0 else ""
+        suffix = "..." if end < len(text) else ""
+        # переноси рядків замінюються пробілами тієї ж довжини, тож позиції збігів не зсуваються
+        body = text[start:end].replace("\r", " ").replace("\n", " ").replace("\t", " ")
+        shift = len(prefix) - start
+        highlights = tuple((span_start + shift, min(span_end, end) + shift)
+                           for span_start, span_end in matched if start <= span_start < end)
+        return prefix + body + suffix, highlights
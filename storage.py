@@ -0,0 +1,386 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import uuid
+import time
+import zlib
+
+
+def atomic_write(path, data):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def preserve_corrupt_file(path):
+    corrupt_path = f"{path}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"
+    try:
+        os.replace(path, corrupt_path)
+        print(f"Файл {path} пошкоджено, його збережено як {corrupt_path}")
+    except OSError as e:
+        print(f"Не вдалося зберегти пошкоджений файл {path}: {e}")
+
+
+def parse_notes(data):
+    if all(isinstance(note, str) for note in data):
+        return [{"title": "", "content": note, "tags": ""} for note in data]
+    return data
+
+
+class JsonStorage:
+    row_updates = False
+
+    def __init__(self, notes_file, tags_file):
+        self.notes_file = notes_file
+        self.tags_file = tags_file
+
+    def _read_notes_file(self):
+        try:
+            with open(self.notes_file, "rb") as file:
+                raw = file.read()
+        except FileNotFoundError:
+            return b"", []
+        try:
+            return raw, parse_notes(json.loads(raw.decode("utf-8")))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            # пошкоджений файл не перезаписується порожнім списком, а відкладається вбік
+            preserve_corrupt_file(self.notes_file)
+            return b"", []
+
+    def _encode_notes(self, notes):
+        return json.dumps(notes, indent=4, ensure_ascii=False).encode("utf-8")
+
+    def load_notes(self):
+        return self._read_notes_file()[1]
+
+    def save_notes(self, notes):
+        atomic_write(self.notes_file, self._encode_notes(notes))
+
+    def load_tags(self):
+        try:
+            with open(self.tags_file, "r", encoding="utf-8") as file:
+                data = json.load(file)
+                if isinstance(data, list) and all("name" in tag and "color" in tag for tag in data):
+                    return data
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return None
+
+    def save_tags(self, tags):
+        data = [{"name": name, "color": color} for name, color in tags.items()]
+        atomic_write(self.tags_file, json.dumps(data, ensure_ascii=False, indent=4).encode("utf-8"))
+
+    def close(self):
+        pass
+
+
+class JournalStorage(JsonStorage):
+    row_updates = True
+
+    def __init__(self, notes_file, tags_file, compact_every=500):
+        super().__init__(notes_file, tags_file)
+        self.journal_file = notes_file + ".journal"
+        self.compact_every = compact_every
+        self._notes = []
+        self._snapshot_crc = 0
+        self._journal_records = 0
+        self._journal_damaged = False
+        self._journal = None
+
+    def load_notes(self):
+        raw, notes = self._read_notes_file()
+        self._snapshot_crc = zlib.crc32(raw)
+        self._journal_records = 0
+        self._journal_damaged = False
+        for record in self._read_journal():
+            self._apply(notes, record)
+            self._journal_records += 1
+        self._notes = notes
+        if self._journal_damaged:
+            # нові записи не можна дописувати після обірваного рядка
+            self.compact()
+        return [dict(note) for note in notes]
+
+    def _read_journal(self):
+        try:
+            with open(self.journal_file, "r", encoding="utf-8") as file:
+                header = file.readline()
+                try:
+                    if json.loads(header).get("snapshot") != self._snapshot_crc:
+                        # журнал уже влито до знімка, але не видалено перед збоєм
+                        return
+                except (json.JSONDecodeError, AttributeError):
+                    return
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # обірваний останній запис після збою
+                        self._journal_damaged = True
+                        break
+                    yield record
+        except FileNotFoundError:
+            return
+
+    @staticmethod
+    def _apply(notes, record):
+        op = record["op"]
+        if op == "insert":
+            notes.insert(record["index"], record["note"])
+        elif op == "insert_many":
+            notes[record["index"]:record["index"]] = record["notes"]
+        elif op == "update":
+            notes[record["index"]] = record["note"]
+        elif op == "delete":
+            del notes[record["index"]]
+        elif op == "move":
+            notes.insert(record["target"], notes.pop(record["source"]))
+
+    def _append(self, record):
+        self._apply(self._notes, record)
+        if self._journal is None:
+            self._journal = open(self.journal_file, "a", encoding="utf-8")
+            if self._journal.tell() == 0 or self._journal_records == 0:
+                self._journal.seek(0)
+                self._journal.truncate()
+                self._journal.write(json.dumps({"snapshot": self._snapshot_crc}) + "\n")
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._journal_records += 1
+        if self._journal_records >= self.compact_every:
+            self.compact()
+
+    def insert_note(self, index, note):
+        self._append({"op": "insert", "index": index, "note": note})
+
+    def insert_notes(self, index, notes):
+        self._append({"op": "insert_many", "index": index, "notes": list(notes)})
+
+    def update_note(self, index, note):
+        self._append({"op": "update", "index": index, "note": note})
+
+    def delete_note(self, index, note_id):
+        self._append({"op": "delete", "index": index})
+
+    def move_note(self, source, target, note_id):
+        self._append({"op": "move", "source": source, "target": target})
+
+    def save_notes(self, notes):
+        self._notes = [dict(note) for note in notes]
+        self.compact()
+
+    def compact(self):
+        data = self._encode_notes(self._notes)
+        atomic_write(self.notes_file, data)
+        self._snapshot_crc = zlib.crc32(data)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self._journal_records = 0
+
+    def close(self):
+        if self._journal_records:
+            self.compact()
+        elif self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+class SqliteStorage:
+    row_updates = True
+
+    def __init__(self, db_file, notes_file, tags_file):
+        self.db_file = db_file
+        # записи виконуються у фоновому потоці, тому доступ до з'єднання захищено блокуванням
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        if self._get_meta("json_imported") is None:
+            self._import_json(JsonStorage(notes_file, tags_file))
+
+    def _create_schema(self):
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS notes ("
+                "position INTEGER NOT NULL, title TEXT NOT NULL DEFAULT '', "
+                "content TEXT NOT NULL DEFAULT '', tags TEXT NOT NULL DEFAULT '', note_id TEXT, "
+                "created TEXT NOT NULL DEFAULT '')"
+            )
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(notes)")}
+            if "note_id" not in columns:
+                self.conn.execute("ALTER TABLE notes ADD COLUMN note_id TEXT")
+            if "created" not in columns:
+                self.conn.execute("ALTER TABLE notes ADD COLUMN created TEXT NOT NULL DEFAULT ''")
+            missing = self.conn.execute("SELECT rowid FROM notes WHERE note_id IS NULL").fetchall()
+            self.conn.executemany(
+                "UPDATE notes SET note_id = ? WHERE rowid = ?",
+                ((uuid.uuid4().hex, rowid) for rowid, in missing)
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS notes_position ON notes(position)")
+            self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS notes_note_id ON notes(note_id)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS tags ("
+                "name TEXT PRIMARY KEY, color TEXT NOT NULL, position INTEGER NOT NULL)"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _import_json(self, json_storage):
+        notes = json_storage.load_notes()
+        tags = json_storage.load_tags()
+        with self.conn:
+            self._write_all_notes(notes)
+            if tags is not None:
+                self._write_all_tags({tag["name"]: tag["color"] for tag in tags})
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', '1')")
+
+    def _write_all_notes(self, notes):
+        self.conn.execute("DELETE FROM notes")
+        self.conn.executemany(
+            "INSERT INTO notes (position, title, content, tags, note_id, created) VALUES (?, ?, ?, ?, ?, ?)",
+            ((i, note.get("title", ""), note.get("content", ""), note.get("tags", ""),
+              note.get("id") or uuid.uuid4().hex, note.get("created", ""))
+             for i, note in enumerate(notes))
+        )
+
+    def _write_all_tags(self, tags):
+        self.conn.execute("DELETE FROM tags")
+        self.conn.executemany(
+            "INSERT INTO tags (name, color, position) VALUES (?, ?, ?)",
+            ((name, color, i) for i, (name, color) in enumerate(tags.items()))
+        )
+        # порожня таблиця після збереження означає, що теги видалено, а не що їх ще не було
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('tags_saved', '1')")
+
+    def load_notes(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT note_id, title, content, tags, created FROM notes ORDER BY position")
+            return [{"id": note_id, "title": title, "content": content, "tags": tags, "created": created}
+                    for note_id, title, content, tags, created in rows]
+
+    def load_note_headers(self, preview_length):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT note_id, title, substr(content, 1, ?), tags, created FROM notes ORDER BY position",
+                (preview_length,)
+            )
+            return [{"id": note_id, "title": title, "preview": preview, "tags": tags, "created": created}
+                    for note_id, title, preview, tags, created in rows]
+
+    def load_note_content(self, note_id):
+        with self.lock:
+            row = self.conn.execute("SELECT content FROM notes WHERE note_id = ?", (note_id,)).fetchone()
+            return row[0] if row else None
+
+    def iter_note_contents(self):
+        # вміст читається порціями, щоб не тримати в пам'яті всі нотатки одночасно
+        with self.lock:
+            cursor = self.conn.execute("SELECT note_id, content FROM notes")
+            while True:
+                rows = cursor.fetchmany(500)
+                if not rows:
+                    return
+                yield from rows
+
+    def save_notes(self, notes):
+        with self.lock:
+            with self.conn:
+                self._write_all_notes(notes)
+
+    def insert_note(self, index, note):
+        with self.lock:
+            with self.conn:
+                self.conn.execute("UPDATE notes SET position = position + 1 WHERE position >= ?", (index,))
+                self.conn.execute(
+                    "INSERT INTO notes (position, title, content, tags, note_id, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    (index, note["title"], note["content"], note["tags"], note["id"], note.get("created", ""))
+                )
+
+    def insert_notes(self, index, notes):
+        # масовий імпорт записується однією транзакцією; notes може бути потоком, що знає свою довжину
+        with self.lock:
+            with self.conn:
+                self.conn.execute("UPDATE notes SET position = position + ? WHERE position >= ?", (len(notes), index))
+                self.conn.executemany(
+                    "INSERT INTO notes (position, title, content, tags, note_id, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    ((index + i, note["title"], note["content"], note["tags"], note["id"], note.get("created", ""))
+                     for i, note in enumerate(notes))
+                )
+
+    def update_note(self, index, note):
+        with self.lock:
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE notes SET title = ?, content = ?, tags = ? WHERE note_id = ?",
+                    (note["title"], note["content"], note["tags"], note["id"])
+                )
+
+    def delete_note(self, index, note_id):
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM notes WHERE note_id = ?", (note_id,))
+                self.conn.execute("UPDATE notes SET position = position - 1 WHERE position > ?", (index,))
+
+    def move_note(self, source, target, note_id):
+        with self.lock:
+            with self.conn:
+                if source < target:
+                    self.conn.execute(
+                        "UPDATE notes SET position = position - 1 WHERE position > ? AND position <= ?",
+                        (source, target)
+                    )
+                else:
+                    self.conn.execute(
+                        "UPDATE notes SET position = position + 1 WHERE position >= ? AND position < ?",
+                        (target, source)
+                    )
+                self.conn.execute("UPDATE notes SET position = ? WHERE note_id = ?", (target, note_id))
+
+    def load_tags(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT name, color FROM tags ORDER BY position").fetchall()
+            if not rows:
+                return [] if self._get_meta("tags_saved") else None
+            return [{"name": name, "color": color} for name, color in rows]
+
+    def save_tags(self, tags):
+        with self.lock:
+            with self.conn:
+                self._write_all_tags(tags)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+STORAGE_ENGINES = ("sqlite", "journal", "json")
+
+
+def open_storage(engine, notes_file, tags_file, db_file):
+    if engine == "sqlite":
+        try:
+            return SqliteStorage(db_file, notes_file, tags_file)
+        except sqlite3.Error as e:
+            print(f"Помилка відкриття бази даних, використовується JSON: {e}")
+    if engine == "journal":
+        return JournalStorage(notes_file, tags_file)
+    return JsonStorage(notes_file, tags_file)
@@ -1,3 +1,6 @@
+import functools
+
+
 class Styles:
     LIGHT_BG = "#ffffff"
     DARK_BG = "#333333"
@@ -14,7 +17,8 @@ class Styles:
                 'note_bg': "#444444",
                 'button_bg': "#444444",
                 'hover_bg': "#555555",
-                'topbar_bg': "#222222"
+                'topbar_bg': "#222222",
+                'highlight': "#7a6420"
             }
         else:
             return {
@@ -24,7 +28,8 @@ class Styles:
                 'note_bg': "#ffffff",
                 'button_bg': "#ffffff",
                 'hover_bg': "#f0f0f0",
-                'topbar_bg': "#ff9633"
+                'topbar_bg': "#ff9633",
+                'highlight': "#ffe08a"
             }
 
     @classmethod
@@ -826,6 +831,10 @@ class Styles:
             QPushButton:hover {{
                 background-color: {theme['hover_bg']};
             }}
+            QPushButton:checked {{
+                background-color: {theme['hover_bg']};
+                border: 2px solid {theme['text']};
+            }}
         """
 
     TAG_LABEL_STYLE = """
@@ -1208,6 +1217,68 @@ class Styles:
             }}
         """
 
+    @classmethod
+    def screen_size_class(cls, width):
+        if width < 800:
+            return 'small'
+        if width < 1200:
+            return 'medium'
+        return 'large'
+
+    @classmethod
+    def get_tag_label_style(cls, color):
+        return cls.TAG_LABEL_STYLE.format(color=color)
+
+    @classmethod
+    def get_page_style(cls, is_dark_mode, size_class, font_size=None):
+        theme = cls.get_theme_styles(is_dark_mode)
+        font_size = font_size or cls.SCREEN_STYLES[size_class]['note_font']
+        return cls.get_main_style(is_dark_mode) + f"""
+            QScrollArea > QWidget {{
+                background-color: transparent;
+            }}
+            QWidget#notesContainer,
+            QWidget#notesContainer QWidget {{
+                background-color: transparent;
+            }}
+            QWidget#notesContainer QPushButton#noteCard {{
+                border: 1px solid {theme['border']};
+                border-radius: 15px;
+                background-color: {theme['note_bg']};
+                color: {theme['text']};
+            }}
+            QWidget#notesContainer QLabel#noteTitle,
+            QWidget#notesContainer QLabel#noteContent {{
+                font-size: {font_size};
+                color: {theme['text']};
+            }}
+            QWidget#notesContainer QPushButton#noteCard[dropTarget="true"] {{
+                border: 2px dashed {theme['border']};
+                background-color: {cls.blend(theme['note_bg'], theme['background'], 0.6)};
+            }}
+            QWidget#notesContainer QPushButton#noteCard[dimmed="true"] {{
+                border-color: {cls.blend(theme['border'], theme['background'], 0.3)};
+                background-color: {cls.blend(theme['note_bg'], theme['background'], 0.3)};
+            }}
+            QWidget#notesContainer QPushButton#noteCard[dimmed="true"] QLabel#noteTitle,
+            QWidget#notesContainer QPushButton#noteCard[dimmed="true"] QLabel#noteContent {{
+                color: {cls.blend(theme['text'], theme['note_bg'], 0.3)};
+            }}
+        """
+
+    @classmethod
+    def blend(cls, color, background, alpha):
+        # колір, яким виглядав би color з прозорістю alpha поверх background
+        front = [int(color[i:i + 2], 16) for i in (1, 3, 5)]
+        back = [int(background[i:i + 2], 16) for i in (1, 3, 5)]
+        return "#" + "".join(f"{round(f * alpha + b * (1 - alpha)):02x}" for f, b in zip(front, back))
+
 
+def _memoize_style_getters():
+    # таблиці стилів залежать лише від аргументів, тому кожна збирається один раз
+    for name, value in list(vars(Styles).items()):
+        if name.startswith("get_") and name != "get_theme_styles" and isinstance(value, classmethod):
+            setattr(Styles, name, classmethod(functools.lru_cache(maxsize=None)(value.__func__)))
 
 
+_memoize_style_getters()
@@ -0,0 +1,244 @@
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+TRANSFER_FORMATS = ("jsonl", "markdown", "zip")
+CHUNK_SIZE = 1000
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def detect_format(path):
+    lower = path.lower()
+    if lower.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if lower.endswith(".zip"):
+        return "zip"
+    return "markdown"
+
+
+def iter_chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ordered_map(pool, func, items, window):
+    # у роботі одночасно не більше window порцій, тож вхід і результати не накопичуються в пам'яті
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def note_to_markdown(note):
+    # заголовок завжди пишеться в заголовну частину, тож текст, що сам починається з "# ", не стане заголовком
+    lines = ["---", f"id: {note['id']}", f"title: {' '.join(note['title'].split())}"]
+    if note.get("created"):
+        lines.append(f"created: {note['created']}")
+    if note["tags"]:
+        lines.append(f"tags: {note['tags']}")
+    lines.append("---")
+    return "\n".join(lines) + "\n" + note["content"]
+
+
+def markdown_to_note(text):
+    text = text.replace("\r\n", "\n")
+    note = {"content": "", "tags": ""}
+    if text.startswith("---\n"):
+        end = text.find("\n---\n", 3)
+        if end >= 0:
+            for line in text[4:end].splitlines():
+                key, _, value = line.partition(":")
+                if key.strip() in ("id", "title", "tags", "created"):
+                    note[key.strip()] = value.strip()
+            text = text[end + 5:]
+    # у файлах без заголовка в заголовній частині ним вважається перший рядок "# ..."
+    if "title" not in note and text.startswith("# "):
+        title, _, text = text.partition("\n")
+        note["title"] = title[2:].strip()
+        if text.startswith("\n"):
+            text = text[1:]
+    note.setdefault("title", "")
+    note["content"] = text
+    return note
+
+
+def markdown_name(position, note):
+    slug = re.sub(r"[^\w\- ]+", "", note["title"]).strip()[:40].strip() or "нотатка"
+    return f"{position:06d}-{slug}.md"
+
+
+def markdown_sort_key(name):
+    number = re.match(r"\d+", os.path.basename(name))
+    return (int(number.group()) if number else sys.maxsize, name)
+
+
+def _read_records(store, chunk):
+    return [(position, store.get_note_record(note_id)) for position, note_id in chunk]
+
+
+def _render_jsonl(store, chunk):
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for _, record in _read_records(store, chunk))
+
+
+def _render_markdown(store, chunk):
+    return [(markdown_name(position, record), note_to_markdown(record)) for position, record in _read_records(store, chunk)]
+
+
+def _write_markdown(store, directory, chunk):
+    for name, text in _render_markdown(store, chunk):
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(text)
+    return len(chunk)
+
+
+def export_notes(store, path, fmt=None, note_ids=None, progress=None, workers=DEFAULT_WORKERS, chunk_size=CHUNK_SIZE):
+    fmt = fmt or detect_format(path)
+    note_ids = store.note_ids() if note_ids is None else list(note_ids)
+    total = len(note_ids)
+    chunks = iter_chunks(enumerate(note_ids, 1), chunk_size)
+    done = 0
+    with ThreadPoolExecutor(workers) as pool:
+        if fmt == "markdown":
+            os.makedirs(path, exist_ok=True)
+            for count in ordered_map(pool, partial(_write_markdown, store, path), chunks, workers * 2):
+                done += count
+                if progress:
+                    progress(done, total)
+            return done
+        temp_path = path + ".tmp"
+        if fmt == "jsonl":
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for text in ordered_map(pool, partial(_render_jsonl, store), chunks, workers * 2):
+                    f.write(text)
+                    done += text.count("\n")
+                    if progress:
+                        progress(done, total)
+        else:
+            with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+                for files in ordered_map(pool, partial(_render_markdown, store), chunks, workers * 2):
+                    for name, text in files:
+                        archive.writestr(name, text)
+                    done += len(files)
+                    if progress:
+                        progress(done, total)
+        os.replace(temp_path, path)
+    return done
+
+
+def _parse_jsonl(lines):
+    notes = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            note = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Помилка читання рядка JSONL: {e}")
+            continue
+        if isinstance(note, dict):
+            notes.append(note)
+    return notes
+
+
+def _parse_markdown_files(paths):
+    notes = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                notes.append(markdown_to_note(f.read()))
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Помилка читання файлу {path}: {e}")
+    return notes
+
+
+def _parse_zip_members(archive, names):
+    # ZipFile дозволяє читати різні файли архіву з кількох потоків, тож розпаковка теж іде порціями паралельно
+    notes = []
+    for name in names:
+        try:
+            notes.append(markdown_to_note(archive.read(name).decode("utf-8")))
+        except (zipfile.BadZipFile, UnicodeDecodeError) as e:
+            print(f"Помилка читання {name} з архіву: {e}")
+    return notes
+
+
+def read_notes(path, fmt=None, progress=None, workers=DEFAULT_WORKERS, chunk_size=CHUNK_SIZE):
+    # вхідні дані читаються порціями паралельно й віддаються потоком, тож увесь вхід не накопичується в пам'яті
+    fmt = fmt or ("markdown" if os.path.isdir(path) else detect_format(path))
+
+    def stream(chunks, parse, total):
+        done = 0
+        with ThreadPoolExecutor(workers) as pool:
+            for parsed in ordered_map(pool, parse, chunks, workers * 2):
+                yield from parsed
+                # сховище індексує кожну нотатку, щойно отримає її, тож прогрес охоплює й індексацію
+                done += len(parsed)
+                if progress:
+                    progress(done, total)
+
+    if fmt == "jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            yield from stream(iter_chunks(f, chunk_size), _parse_jsonl, None)
+    elif fmt == "zip":
+        with zipfile.ZipFile(path) as archive:
+            names = sorted((name for name in archive.namelist() if name.lower().endswith(".md")), key=markdown_sort_key)
+            yield from stream(iter_chunks(names, chunk_size), partial(_parse_zip_members, archive), len(names))
+    else:
+        names = sorted((name for name in os.listdir(path) if name.lower().endswith(".md")), key=markdown_sort_key)
+        paths = [os.path.join(path, name) for name in names]
+        yield from stream(iter_chunks(paths, chunk_size), _parse_markdown_files, len(paths))
+
+
+def import_notes(store, path, fmt=None, progress=None, workers=DEFAULT_WORKERS, chunk_size=CHUNK_SIZE):
+    return store.add_notes(read_notes(path, fmt, progress, workers, chunk_size))
+
+
+def main():
+    from notes_core import NotesStore
+    from storage import STORAGE_ENGINES
+    parser = argparse.ArgumentParser(description="Масовий імпорт і експорт нотаток")
+    parser.add_argument("action", choices=("import", "export"))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=TRANSFER_FORMATS, help="за замовчуванням визначається з шляху")
+    parser.add_argument("--storage", choices=STORAGE_ENGINES, default=os.environ.get("NOTES_STORAGE", "sqlite"))
+    parser.add_argument("--search", default="", help="експортувати лише знайдені нотатки")
+    parser.add_argument("--tag", default=None, help="експортувати лише нотатки з тегом")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    def report(done, total):
+        print(f"\r{done}" + (f"/{total}" if total is not None else ""), end="", file=sys.stderr)
+
+    store = NotesStore(storage=args.storage, lazy_content=os.environ.get("NOTES_LAZY_CONTENT") == "1")
+    try:
+        if args.action == "import":
+            count = len(import_notes(store, args.path, args.format, report, args.workers))
+        else:
+            note_ids = None
+            if args.search or args.tag:
+                note_ids = [note_id for note_id, match in zip(store.note_ids(), store.search(args.search, args.tag)) if match]
+            count = export_notes(store, args.path, args.format, note_ids, report, args.workers)
+        print(file=sys.stderr)
+        print(f"Оброблено нотаток: {count}", file=sys.stderr)
+    finally:
+        store.flush()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()